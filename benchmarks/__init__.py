@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for the resume screening pipeline
+Author: Gladiator2005
+Date: 2025-11-09
+Usage: python -m benchmarks.run --scale 1000 --out bench.json
+"""
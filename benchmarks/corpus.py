@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic resume PDFs and job descriptions for benchmarking
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import json
+import os
+import random
+from config import SKILLS_DB
+
+KINDS = ("native", "scanned", "mixed")
+# Bump whenever generation changes, so cached corpora are rebuilt rather than reused
+CORPUS_VERSION = 1
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Okafor", "Novak", "Haddad", "Silva", "Kim", "Patel", "Berg"]
+TITLES = ["Software Engineer", "Data Scientist", "Backend Developer", "DevOps Engineer",
+          "Frontend Developer", "ML Engineer", "Data Engineer", "Full Stack Developer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Tech", "Hooli"]
+DUTIES = [
+    "Built and maintained {a} services backed by {b}",
+    "Migrated legacy systems to {a} and {b}, cutting costs by {n}%",
+    "Led a team of {n} engineers delivering {a} features",
+    "Designed data pipelines with {a} feeding {b} dashboards",
+    "Automated deployments using {a} and {b}",
+    "Improved {a} query latency by {n}% through profiling and caching",
+    "Mentored junior developers on {a} best practices",
+]
+JD_TEMPLATES = [
+    "We are hiring a {title} to join our team. You will work with {skills}. "
+    "Experience with {extra} is a plus.",
+    "{title} wanted. Required skills: {skills}. Nice to have: {extra}. "
+    "You will design, build and operate production systems.",
+]
+
+
+def resume_text(rng, pages=1):
+    """Plain-text resume: header, summary, skills line and one experience block per page"""
+    skills = rng.sample(SKILLS_DB, rng.randint(5, 15))
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{rng.choice(TITLES)} | {name.split()[0].lower()}@example.com | +1 555 {rng.randint(1000, 9999)}",
+        "",
+        "Summary",
+        f"{rng.randint(2, 15)} years of experience with {', '.join(skills[:3])}.",
+        "",
+        "Technical Skills: " + ", ".join(skills),
+    ]
+    page_texts = []
+    for page in range(pages):
+        block = list(lines) if page == 0 else []
+        block += ["", "Experience"]
+        for _ in range(rng.randint(2, 4)):
+            block.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({rng.randint(2010, 2024)})")
+            for _ in range(rng.randint(2, 5)):
+                duty = rng.choice(DUTIES).format(a=rng.choice(skills), b=rng.choice(skills), n=rng.randint(2, 60))
+                block.append(f"- {duty}")
+        page_texts.append("\n".join(block))
+    return page_texts
+
+
+def job_description(rng):
+    skills = rng.sample(SKILLS_DB, rng.randint(4, 10))
+    return rng.choice(JD_TEMPLATES).format(
+        title=rng.choice(TITLES), skills=", ".join(skills[:-2]), extra=" and ".join(skills[-2:])
+    )
+
+
+def _text_page(doc, text):
+    page = doc.new_page(width=595, height=842)
+    page.insert_textbox((50, 50, 545, 800), text, fontsize=9, fontname="helv")
+
+
+def _scanned_page(doc, text, dpi=150):
+    """A page with no text layer: the text rendered to an image, as a scanner would produce"""
+    from PIL import Image, ImageDraw
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    y = dpi // 2
+    for line in text.splitlines():
+        draw.text((dpi // 2, y), line, fill=0)
+        y += dpi // 6
+        if y > height - dpi // 2:
+            break
+    page = doc.new_page(width=595, height=842)
+    from io import BytesIO
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    page.insert_image(page.rect, stream=buf.getvalue())
+
+
+def build_pdf(path, page_texts, kind):
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    for i, text in enumerate(page_texts):
+        # Mixed documents have a text-layer first page and scanned pages after it
+        if kind == "scanned" or (kind == "mixed" and i > 0):
+            _scanned_page(doc, text)
+        else:
+            _text_page(doc, text)
+    doc.save(path)
+    doc.close()
+
+
+def _assign_kinds(rng, n, mix):
+    """Exactly round(n * share) PDFs of each kind (every kind with a share shows up once n allows), shuffled"""
+    total = float(sum(mix))
+    counts = [int(round(n * share / total)) for share in mix]
+    for k, share in enumerate(mix):
+        if share > 0 and counts[k] == 0 and n >= len(mix):
+            counts[k] = 1
+    counts[0] += n - sum(counts)
+    kinds = [kind for kind, count in zip(KINDS, counts) for _ in range(count)]
+    rng.shuffle(kinds)
+    return kinds
+
+
+def generate_corpus(out_dir, n_resumes, n_roles=5, seed=42, mix=(0.8, 0.1, 0.1)):
+    """
+    Write n_resumes PDFs (native / scanned / mixed in the given proportions)
+    and n_roles job descriptions under out_dir. The same (n, seed, mix) always
+    yields the same corpus, and an existing complete corpus is reused.
+    Returns the manifest: {"pdfs": [{"path", "kind", "pages"}], "job_descriptions": [...]}.
+    """
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    params = [CORPUS_VERSION, n_resumes, n_roles, seed, list(mix)]
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("params") == params:
+            return manifest
+        for pdf in manifest.get("pdfs", []):
+            if os.path.exists(pdf["path"]):
+                os.remove(pdf["path"])
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    pdfs = []
+    for i, kind in enumerate(_assign_kinds(rng, n_resumes, mix)):
+        pages = 1 if kind == "native" and rng.random() < 0.7 else rng.randint(2, 4)
+        path = os.path.join(out_dir, f"resume_{i:05d}_{kind}.pdf")
+        build_pdf(path, resume_text(rng, pages), kind)
+        pdfs.append({"path": path, "kind": kind, "pages": pages})
+
+    manifest = {
+        "params": params,
+        "pdfs": pdfs,
+        "job_descriptions": [job_description(rng) for _ in range(n_roles)],
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
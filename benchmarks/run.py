@@ -0,0 +1,327 @@
+"""
+Stage-by-stage benchmark of the screening pipeline on a synthetic corpus
+Author: Gladiator2005
+Date: 2025-11-09
+Usage: python -m benchmarks.run --scale 1000 --out bench.json [--baseline old.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks.corpus import generate_corpus
+from metrics import configure_logging, snapshot
+from config import SKILLS_DB, DEFAULT_SEMANTIC_THRESHOLD, ENCODER_BACKEND
+
+SCALES = (10, 1000, 10000)
+
+
+class HashingEncoder:
+    """
+    Bag-of-words feature-hashing encoder with the SentenceTransformer encode()
+    interface. Needs no model download, so the whole suite runs offline; its
+    timings measure the pipeline around the encoder, not the transformer.
+    """
+
+    def __init__(self, model_name=None, dim=384):
+        self.dim = dim
+        self.max_seq_length = 256
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.blake2b(word.encode(), digest_size=4).hexdigest(), 16) % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1.0)
+        return vectors
+
+
+def _register_hashing_encoder():
+    from encoders import ENCODER_BACKENDS
+    ENCODER_BACKENDS.setdefault("hashing", HashingEncoder)
+
+
+def _rss_mb():
+    """Current resident set size (Linux /proc; falls back to the peak elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return _peak_rss_mb()[0]
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process and of its largest finished child (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2 ** 20
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2 ** 20
+    return own, children
+
+
+def _git_commit():
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+class Bench:
+    """Collects one record per timed stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, items, fn, *args, **kwargs):
+        """Time fn(*args, **kwargs) as stage name over items units of work; returns fn's result"""
+        print(f"[INFO] Benchmarking {name} ({items} item(s))...")
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        peak, children_peak = _peak_rss_mb()
+        self.stages[name] = {
+            "seconds": seconds,
+            "items": items,
+            "items_per_sec": items / seconds if seconds > 0 else None,
+            "rss_mb": round(_rss_mb(), 1),
+            # ru_maxrss never goes down: this is the high-water mark up to the end of the stage
+            "peak_rss_mb": round(peak, 1),
+            "children_peak_rss_mb": round(children_peak, 1),
+        }
+        return result
+
+    def note(self, name, **fields):
+        self.stages[name].update(fields)
+
+
+def _extract_all(fn, paths):
+    """Run one extraction backend over paths; failures are counted, not raised"""
+    texts, errors = [], []
+    for path in paths:
+        try:
+            texts.append(fn(path))
+        except Exception as e:
+            texts.append("")
+            errors.append(f"{type(e).__name__}: {e}")
+    return texts, errors
+
+
+def bench_extraction(bench, pdfs, ocr_sample, workers):
+    from pdf_extractor import (extract_text_with_pymupdf, extract_text_with_pdfplumber, extract_text_with_page_ocr,
+                               extract_texts_parallel)
+    paths = [pdf["path"] for pdf in pdfs]
+
+    for backend, fn in (("pymupdf", extract_text_with_pymupdf), ("pdfplumber", extract_text_with_pdfplumber)):
+        texts, errors = bench.run(f"extract:{backend}", len(paths), _extract_all, fn, paths)
+        bench.note(f"extract:{backend}", errors=len(errors), first_error=errors[0] if errors else None,
+                   empty=sum(1 for t in texts if not t.strip()))
+
+    # OCR is orders of magnitude slower than the text layer; time a sample of the image-only files
+    scanned = [pdf["path"] for pdf in pdfs if pdf["kind"] != "native"][:ocr_sample]
+    if scanned:
+        texts, errors = bench.run("extract:ocr", len(scanned), _extract_all,
+                                  lambda path: extract_text_with_page_ocr(path)[0], scanned)
+        bench.note("extract:ocr", errors=len(errors), first_error=errors[0] if errors else None,
+                   empty=sum(1 for t in texts if not t.strip()))
+
+    results = bench.run("extract:pipeline", len(paths), extract_texts_parallel, paths, max_workers=workers)
+    errors = [err for _, err in results if err]
+    bench.note("extract:pipeline", errors=len(errors), first_error=errors[0] if errors else None, workers=workers)
+    return [text for text, _ in results]
+
+
+def bench_skills(bench, texts):
+    """Time both skill backends and check the automaton finds exactly what spaCy finds"""
+    from skill_extractor import SkillExtractor
+    found = {}
+    for backend in ("spacy", "automaton"):
+        extractor = SkillExtractor(SKILLS_DB, backend=backend)
+        extractor.extract_skills_batch(["Warm-up resume: Python, SQL and Docker."])
+        found[backend] = bench.run(f"skills:{backend}", len(texts), lambda: [extractor.extract_skills(t) for t in texts])
+        bench.run(f"skills:{backend}-batch", len(texts), extractor.extract_skills_batch, texts)
+
+    # Known differences are listed on skill_matcher.SkillAutomaton
+    mismatches = [(text, spacy_skills, automaton_skills)
+                  for text, spacy_skills, automaton_skills in zip(texts, found["spacy"], found["automaton"])
+                  if spacy_skills != automaton_skills]
+    first = None
+    if mismatches:
+        text, spacy_skills, automaton_skills = mismatches[0]
+        first = {"spacy_only": sorted(set(spacy_skills) - set(automaton_skills)),
+                 "automaton_only": sorted(set(automaton_skills) - set(spacy_skills)), "text": text[:200]}
+    bench.note("skills:automaton", mismatches=len(mismatches), first_mismatch=first)
+
+
+def bench_semantic(bench, texts, job_descriptions, backend, threshold):
+    from semantic_matcher import SemanticMatcher
+    from skill_extractor import SkillExtractor
+    # Time the encoder, not the embedding cache
+    matcher = SemanticMatcher(cache=False, backend=backend)
+    matcher.encode(["warm-up"])
+
+    embeddings = bench.run("encode", len(texts), matcher.encode_resumes, texts)
+    bench.note("encode", **(matcher.last_batch_stats or {}))
+
+    extractor = SkillExtractor(SKILLS_DB, backend="automaton")
+    roles_skills = [extractor.extract_skills(jd) for jd in job_descriptions]
+    role_vectors = matcher.encode_roles(roles_skills, job_descriptions)
+    bench.run("score", len(texts) * len(job_descriptions), matcher.score_roles, roles_skills, job_descriptions,
+              embeddings, threshold=threshold, role_vectors=role_vectors)
+    bench.note("score", roles=len(job_descriptions))
+
+
+def bench_end_to_end(bench, pdfs, job_descriptions, backend, threshold, workers, work_dir):
+    """The full screen_resumes_multi_role path on a fresh database; its store stage is the DB write cost"""
+    from screening_engine import ResumeScreener
+    screener = ResumeScreener(db_path=os.path.join(work_dir, "bench.db"), encoder_backend=backend, embedding_cache=False)
+    role_ids = [screener.db.add_role(f"Bench role {k + 1}", "; ".join(screener.skill_extractor.extract_skills(jd)))
+                for k, jd in enumerate(job_descriptions)]
+    screener.warm_up()
+
+    timings = {}
+    paths = [pdf["path"] for pdf in pdfs]
+    bench.run("end_to_end", len(paths), screener.screen_resumes_multi_role, paths, role_ids=role_ids,
+              semantic_threshold=threshold, extraction_workers=workers, timings=timings)
+    bench.note("end_to_end", stages=timings, roles=len(role_ids))
+    bench.stages["db_write"] = {"seconds": timings.get("store", 0.0), "items": len(paths) * (len(role_ids) + 1),
+                                "items_per_sec": len(paths) * (len(role_ids) + 1) / timings["store"]
+                                if timings.get("store") else None,
+                                "note": "resume rows and compressed texts, exact skills, vectors and one "
+                                        "result row per role, from end_to_end's store stage"}
+
+
+def run_benchmarks(scale, seed=42, roles=5, mix=(0.8, 0.1, 0.1), corpus_dir=None, encoder=ENCODER_BACKEND,
+                   workers=None, ocr_sample=5, threshold=DEFAULT_SEMANTIC_THRESHOLD, stages=None):
+    """Run the selected stage groups (default: all) and return the JSON-ready report"""
+    stages = set(stages or ("extract", "skills", "semantic", "end_to_end"))
+    if encoder == "hashing":
+        _register_hashing_encoder()
+
+    corpus_dir = os.path.abspath(corpus_dir or os.path.join(tempfile.gettempdir(), "resume-bench", f"n{scale}-s{seed}"))
+    started = time.perf_counter()
+    manifest = generate_corpus(corpus_dir, scale, n_roles=roles, seed=seed, mix=mix)
+    corpus_seconds = time.perf_counter() - started
+    pdfs, job_descriptions = manifest["pdfs"], manifest["job_descriptions"]
+
+    bench = Bench()
+    texts = None
+    if "extract" in stages:
+        texts = bench_extraction(bench, pdfs, ocr_sample, workers)
+    if texts is None or not any(t.strip() for t in texts):
+        from pdf_extractor import extract_text_with_pymupdf
+        texts = _extract_all(extract_text_with_pymupdf, [pdf["path"] for pdf in pdfs])[0]
+    texts = [t for t in texts if t.strip()]
+
+    if "skills" in stages:
+        bench_skills(bench, texts)
+    if "semantic" in stages:
+        bench_semantic(bench, texts, job_descriptions, encoder, threshold)
+    if "end_to_end" in stages:
+        with tempfile.TemporaryDirectory(prefix="resume-bench-db-") as work_dir:
+            bench_end_to_end(bench, pdfs, job_descriptions, encoder, threshold, workers, work_dir)
+
+    commit, dirty = _git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {"scale": scale, "seed": seed, "roles": roles, "mix": list(mix), "encoder": encoder,
+                   "workers": workers, "ocr_sample": ocr_sample, "threshold": threshold},
+        "corpus": {
+            "dir": corpus_dir,
+            "seconds": corpus_seconds,
+            "pdfs": len(pdfs),
+            "pages": sum(pdf["pages"] for pdf in pdfs),
+            "kinds": {kind: sum(1 for pdf in pdfs if pdf["kind"] == kind) for kind in ("native", "scanned", "mixed")},
+        },
+        "stages": bench.stages,
+        # Extraction paths, OCR pages, encode batch sizes, DB write latency, ... over the whole run
+        "metrics": snapshot(),
+        "peak_rss_mb": round(_peak_rss_mb()[0], 1),
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"[INFO] Benchmark at {report['commit'] or 'unknown commit'}{' (dirty)' if report['dirty'] else ''}: "
+          f"{report['corpus']['pdfs']} PDF(s), encoder {report['params']['encoder']}")
+    base_stages = (baseline or {}).get("stages", {})
+    for name, stage in report["stages"].items():
+        rate = f"{stage['items_per_sec']:10.1f}/s" if stage.get("items_per_sec") else " " * 12
+        line = f"[INFO]   {name:<22} {stage['seconds']:9.3f}s {rate}"
+        if "peak_rss_mb" in stage:
+            line += f"  peak {stage['peak_rss_mb']:7.1f} MB"
+        if stage.get("errors"):
+            line += f"  {stage['errors']} error(s)"
+        if stage.get("mismatches"):
+            line += f"  {stage['mismatches']} mismatch(es) vs spacy"
+        if name in base_stages and base_stages[name]["seconds"] > 0:
+            line += f"  {stage['seconds'] / base_stages[name]['seconds']:5.2f}x baseline"
+        print(line)
+    print(f"[INFO] Peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the screening pipeline on a synthetic resume corpus")
+    parser.add_argument("--scale", type=int, default=SCALES[0], help=f"Number of resumes (e.g. {', '.join(map(str, SCALES))})")
+    parser.add_argument("--roles", type=int, default=5, help="Job descriptions to score against")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", default="0.8,0.1,0.1", help="Share of native,scanned,mixed PDFs")
+    parser.add_argument("--corpus-dir", help="Where to generate (and reuse) the corpus (default: a temp dir)")
+    parser.add_argument("--encoder", default=ENCODER_BACKEND,
+                        help="Encoder backend; 'hashing' runs fully offline without the transformer")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes")
+    parser.add_argument("--ocr-sample", type=int, default=5, help="Scanned PDFs to time the OCR backend on")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_SEMANTIC_THRESHOLD)
+    parser.add_argument("--stage", action="append", dest="stages", choices=("extract", "skills", "semantic", "end_to_end"),
+                        help="Stage group to run (repeatable; default: all)")
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare stage times against")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    mix = tuple(float(share) for share in args.mix.split(","))
+    if len(mix) != 3 or sum(mix) <= 0:
+        print("[ERROR] --mix needs three non-negative shares: native,scanned,mixed")
+        return 1
+
+    report = run_benchmarks(args.scale, seed=args.seed, roles=args.roles, mix=mix, corpus_dir=args.corpus_dir,
+                            encoder=args.encoder, workers=args.workers, ocr_sample=args.ocr_sample,
+                            threshold=args.threshold, stages=args.stages)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Headless batch screening from the command line
+Author: Gladiator2005
+Date: 2025-11-09
+Usage: python cli.py screen ./resumes --role-id 1 --role-id 2
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from config import CLI_BATCH_SIZE, DEFAULT_SEMANTIC_THRESHOLD, LOG_LEVEL, LOG_FORMAT, METRICS_TEXTFILE_PATH
+from metrics import configure_logging, write_textfile, snapshot
+
+STAGES = ("extract", "skills", "embed", "score", "store")
+
+logger = logging.getLogger("cli")
+
+
+def iter_pdf_paths(source):
+    """
+    Yield PDF paths from a directory (walked recursively, in sorted order) or
+    from a manifest file listing one path per line. Relative manifest entries
+    are resolved against the manifest's directory; blank lines and '#' comments
+    are skipped.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    yield os.path.join(root, name)
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line if os.path.isabs(line) else os.path.join(base, line)
+
+
+def iter_batches(paths, batch_size, skip=()):
+    """Group paths into lists of at most batch_size, leaving out those in skip"""
+    batch = []
+    for path in paths:
+        if path in skip:
+            continue
+        batch.append(path)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_batch(screener, source, role_ids=None, run_name=None, batch_size=CLI_BATCH_SIZE,
+              semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD, extraction_workers=None, restart=False,
+              metrics_file=None):
+    """
+    Screen every PDF under source against the given roles (all roles by default)
+    in batches of batch_size. Each finished batch is checkpointed in the
+    database, so re-running with the same run name skips what's already done.
+    Returns a summary dict with counts, throughput, per-stage seconds and the
+    extraction method counts; metrics_file gets the Prometheus metrics after
+    every batch.
+    """
+    run_name = run_name or os.path.abspath(source)
+    run = screener.db.start_batch_run(run_name, os.path.abspath(source), role_ids, restart=restart)
+    if run["resumed"] and role_ids is not None and run["role_ids"] != list(role_ids):
+        logger.warning("Run '%s' was started for role(s) %s; resuming with those", run_name, run["role_ids"])
+    role_ids = run["role_ids"]
+
+    done = screener.db.batch_run_done_paths(run["id"])
+    if done:
+        logger.info("Resuming run '%s': %d file(s) already screened", run_name, len(done))
+
+    timings = {}
+    processed = 0
+    started = time.perf_counter()
+    status = "failed"
+    try:
+        for batch in iter_batches(iter_pdf_paths(source), batch_size, skip=done):
+            screener.screen_resumes_multi_role(
+                batch,
+                role_ids=role_ids,
+                semantic_threshold=semantic_threshold,
+                extraction_workers=extraction_workers,
+                timings=timings,
+                checkpoint=(run["id"], batch)  # committed together with the batch's results
+            )
+            write_textfile(metrics_file)
+            processed += len(batch)
+            elapsed = time.perf_counter() - started
+            logger.info("Batch done: %d file(s) this run, %.1f resumes/sec", processed, processed / elapsed,
+                        extra={"run": run_name, "processed": processed, "resumes_per_sec": processed / elapsed})
+        status = "finished"
+    except KeyboardInterrupt:
+        status = "interrupted"
+        logger.warning("Interrupted; re-run with --run '%s' to resume", run_name)
+    finally:
+        screener.db.finish_batch_run(run["id"], status)
+        write_textfile(metrics_file)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "run": run_name,
+        "status": status,
+        "processed": processed,
+        "skipped": len(done),
+        "seconds": elapsed,
+        "resumes_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+        "stages": timings,
+        "extraction_methods": snapshot().get("resume_extraction_files_total", {})
+    }
+
+
+def print_summary(summary):
+    print(f"[INFO] Run '{summary['run']}' {summary['status']}: {summary['processed']} file(s) screened, "
+          f"{summary['skipped']} skipped from earlier runs, {summary['seconds']:.1f}s "
+          f"({summary['resumes_per_sec']:.2f} resumes/sec)")
+    total = sum(summary["stages"].values()) or 1.0
+    for stage in STAGES:
+        secs = summary["stages"].get(stage, 0.0)
+        print(f"[INFO]   {stage:<8} {secs:8.2f}s  {100 * secs / total:5.1f}%")
+    methods = summary.get("extraction_methods")
+    if methods:
+        print("[INFO] Extraction paths: " + ", ".join(f"{method} {count}" for method, count in sorted(methods.items())))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Resume screening without the web UI")
+    parser.add_argument("--log-format", choices=("text", "json"), default=LOG_FORMAT)
+    parser.add_argument("--log-level", default=LOG_LEVEL)
+    parser.add_argument("--metrics-file", default=METRICS_TEXTFILE_PATH,
+                        help="Write Prometheus metrics here after every batch and at exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    screen = commands.add_parser("screen", help="Screen a directory or manifest of PDFs")
+    screen.add_argument("source", help="Directory of PDFs (searched recursively) or a manifest file, one path per line")
+    screen.add_argument("--role-id", type=int, action="append", dest="role_ids",
+                        help="Role to screen against (repeatable; default: every role)")
+    screen.add_argument("--run", dest="run_name", help="Checkpoint name (default: the source path)")
+    screen.add_argument("--batch-size", type=int, default=CLI_BATCH_SIZE)
+    screen.add_argument("--threshold", type=float, default=DEFAULT_SEMANTIC_THRESHOLD)
+    screen.add_argument("--workers", type=int, default=None, help="PDF extraction processes")
+    screen.add_argument("--restart", action="store_true", help="Ignore the checkpoint and screen everything again")
+    screen.add_argument("--profile", action="store_true",
+                        help="Profile the first batch (cProfile + tracemalloc per stage) into PROFILE_DIR")
+
+    rescreen = commands.add_parser("rescreen", help="Screen stored resumes for a role from their stored texts (no PDFs)")
+    rescreen.add_argument("--role-id", type=int, required=True)
+    rescreen.add_argument("--resume-id", type=int, action="append", dest="resume_ids",
+                          help="Resume to re-screen (repeatable; default: every stored resume)")
+    rescreen.add_argument("--threshold", type=float, default=DEFAULT_SEMANTIC_THRESHOLD)
+    rescreen.add_argument("--batch-size", type=int, default=CLI_BATCH_SIZE)
+
+    parity = commands.add_parser("encoder-parity", help="Compare an encoder backend against fp32 torch")
+    parity.add_argument("--backend", default="torch-int8", help="Backend to check (torch-int8, onnx)")
+    parity.add_argument("--sample", type=int, default=200, help="Stored resumes to use as the corpus")
+
+    commands.add_parser("roles", help="List stored roles")
+    commands.add_parser("warm-up", help="Load the models and report how long each stage takes")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    configure_logging(args.log_level.upper(), args.log_format, force=True)
+
+    # Imported here so `--help` stays instant
+    from screening_engine import ResumeScreener
+    screener = ResumeScreener()
+
+    if args.command == "roles":
+        print(screener.db.list_roles().to_string(index=False))
+    elif args.command == "warm-up":
+        screener.warm_up()
+    elif args.command == "rescreen":
+        started = time.perf_counter()
+        results = screener.rescreen_resumes(args.role_id, args.resume_ids, semantic_threshold=args.threshold,
+                                            batch_size=max(1, args.batch_size))
+        write_textfile(args.metrics_file)
+        elapsed = time.perf_counter() - started
+        stats = screener.db.text_storage_stats()
+        print(f"[INFO] Re-screened {len(results)} stored resume(s) in {elapsed:.1f}s")
+        print(f"[INFO] Stored texts: {stats['texts']} ({stats['raw_bytes'] / 1024:.0f} KB raw, "
+              f"{stats['stored_bytes'] / 1024:.0f} KB compressed, {stats['ratio']:.1f}x)")
+        for row in sorted(results, key=lambda r: r["similarity_score"], reverse=True)[:10]:
+            print(f"[INFO]   {row['similarity_score']:.3f}  {row['num_matched_skills']:>3} skill(s)  {row['pdf_path']}")
+    elif args.command == "encoder-parity":
+        from encoders import parity_report, print_parity_report
+        texts = []
+        for rows in screener.db.iter_resume_texts():
+            texts.extend(text for _, text in rows)
+            if len(texts) >= args.sample:
+                break
+        if not texts:
+            print("[ERROR] No stored resume texts to compare on; screen some resumes first")
+            return 1
+        print_parity_report(parity_report(texts[:args.sample], args.backend))
+    elif args.command == "screen":
+        if not os.path.exists(args.source):
+            print(f"[ERROR] Not found: {args.source}")
+            return 1
+        if args.profile:
+            screener.profile_next_run()
+        summary = run_batch(
+            screener,
+            args.source,
+            role_ids=args.role_ids,
+            run_name=args.run_name,
+            batch_size=max(1, args.batch_size),
+            semantic_threshold=args.threshold,
+            extraction_workers=args.workers,
+            restart=args.restart,
+            metrics_file=args.metrics_file
+        )
+        print_summary(summary)
+        if screener.last_profile_path:
+            print(f"[INFO] Profile: {screener.last_profile_path}")
+        return 0 if summary["status"] == "finished" else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,16 +6,88 @@ Date: 2025-11-09
 
 # Database Configuration
 DB_PATH = "resume_screening_multi_role.db"
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT = 30000  # milliseconds
+DB_CACHE_SIZE_KB = 20000
 
 # Spacy Model
 SPACY_MODEL = "en_core_web_sm"
 
+# spaCy batching for skill extraction. Only the components listed here run on the
+# hot path (the PhraseMatcher needs just the tokenizer); the full pipeline is run
+# lazily for the rare noun-chunk fallback.
+SPACY_BATCH_SIZE = 64
+SPACY_N_PROCESS = 1
+SPACY_MATCHER_COMPONENTS = []
+
+# Skill matching backend: "spacy" (PhraseMatcher) or "automaton" (pure-Python, linear-time)
+SKILL_MATCHER_BACKEND = "spacy"
+
 # Sentence Transformer Model
 SENTENCE_TRANSFORMER_MODEL = "all-MiniLM-L6-v2"
 
+# Encoder backend: "torch" (fp32), "torch-int8" (dynamically quantized, CPU) or
+# "onnx" (ONNX Runtime; needs sentence-transformers[onnx]). Check drift against
+# fp32 with: python cli.py encoder-parity --backend torch-int8
+ENCODER_BACKEND = "torch"
+
+# Encode scheduling: texts are batched longest-first so that batch size x longest
+# text stays under the token budget (e.g. 16 full-length 256-token resumes); on CPU
+# smaller, denser batches beat large padded ones
+ENCODE_TOKEN_BUDGET = 4096
+ENCODE_MAX_BATCH_SIZE = 64
+
 # Semantic Matching Threshold
 DEFAULT_SEMANTIC_THRESHOLD = 0.45
 
+# Parallel PDF Extraction (None = one worker per CPU core; timeout is seconds per file)
+EXTRACTION_WORKERS = None
+EXTRACTION_TIMEOUT = 120
+
+# Page-level OCR for pages without a text layer (budget = max pages OCR'd per document)
+OCR_DPI = 200
+OCR_MAX_PAGES = 10
+OCR_WORKERS = 4
+OCR_MIN_PAGE_CHARS = 10
+OCR_PAGE_TIMEOUT = 60  # seconds before tesseract is killed on one page
+
+# Full resume texts are stored compressed: "zlib" (standard library) or "zstd"
+# (needs the zstandard package; falls back to zlib without it)
+RESUME_TEXT_CODEC = "zlib"
+
+# Resume Embedding Cache (content-addressed, keyed by text hash + model name)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = "resume_embedding_cache.db"
+EMBEDDING_CACHE_MAX_ENTRIES = 50000
+
+# Streaming screening (iter_screen_resumes): resumes per micro-batch
+STREAM_BATCH_SIZE = 32
+
+# Headless batch CLI (cli.py): PDFs screened and checkpointed per batch
+CLI_BATCH_SIZE = 200
+
+# Background screening jobs (Streamlit): concurrent jobs and files per progress step
+JOB_WORKERS = 1
+JOB_BATCH_SIZE = 16
+JOB_POLL_SECONDS = 2
+
+# Load models in a background thread when the Streamlit app starts (otherwise on first use)
+WARM_UP_ON_START = True
+
+# Telemetry: log level/format ("text" prints "[INFO] message", "json" one object per
+# line with the structured fields) and Prometheus metrics export. The text file is
+# rewritten after every screening batch (node_exporter textfile collector); the
+# port serves /metrics over HTTP. None disables either export.
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
+METRICS_TEXTFILE_PATH = None
+METRICS_PORT = None
+
+# Profiling (ResumeScreener.profile_next_run / Settings page): where profile artifacts
+# go and how many hot functions / allocation sites to keep per stage
+PROFILE_DIR = "profiles"
+PROFILE_TOP_N = 25
+
 # Comprehensive Skills Database (100+ technical skills)
 SKILLS_DB = [
     # Programming Languages
@@ -4,10 +4,143 @@ Author: Gladiator2005
 Date: 2025-11-09
 """
 
+import hashlib
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timezone
-import pandas as pd
-from config import DB_PATH
+import numpy as np
+from config import DB_PATH, DB_POOL_SIZE, DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB, RESUME_TEXT_CODEC
+from metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+DB_WRITE_SECONDS = histogram("resume_db_write_seconds", "Write transaction time, BEGIN to COMMIT", ("op",))
+DB_LOCK_WAIT_SECONDS = histogram("resume_db_write_lock_wait_seconds", "Time waiting for the write lock", ("op",))
+DB_WRITE_ERRORS = counter("resume_db_write_errors_total", "Write transactions rolled back", ("op",))
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress_text(text, codec=RESUME_TEXT_CODEC):
+    """
+    (codec, blob) for a resume text; zstd needs the optional zstandard package, else zlib
+    is used. Texts too short to shrink are kept as plain UTF-8 ("raw").
+    """
+    data = text.encode("utf-8")
+    zstandard = _zstd() if codec == "zstd" else None
+    if zstandard is not None:
+        codec, blob = "zstd", zstandard.ZstdCompressor(level=9).compress(data)
+    else:
+        codec, blob = "zlib", zlib.compress(data, 9)
+    return (codec, blob) if len(blob) < len(data) else ("raw", data)
+
+
+def decompress_text(codec, blob):
+    if codec == "raw":
+        return bytes(blob).decode("utf-8")
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("This resume text is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def text_hash(text):
+    """Content address of an extracted text (SHA-256 of its UTF-8 bytes)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent SQLite connections for one database file.
+    Connections run in WAL mode so readers never block the writer, and writes
+    are serialized through a lock instead of contending for SQLite's.
+    """
+    
+    _pools = {}
+    _pools_lock = threading.Lock()
+    
+    @classmethod
+    def for_path(cls, db_path):
+        """Shared pool per database file, so every ResumeDatabase in the process reuses it"""
+        key = os.path.abspath(db_path)
+        with cls._pools_lock:
+            if key not in cls._pools:
+                cls._pools[key] = cls(db_path)
+            return cls._pools[key]
+    
+    def __init__(self, db_path, size=DB_POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.write_lock = threading.RLock()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT / 1000, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT)}")
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection (autocommit mode) and return it to the pool afterwards"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    @contextmanager
+    def transaction(self, op="write"):
+        """Cursor inside one write transaction; commits on success, rolls back on error. op labels its metrics."""
+        waited = time.perf_counter()
+        with self.write_lock, self.connection() as conn:
+            started = time.perf_counter()
+            DB_LOCK_WAIT_SECONDS.observe(started - waited, op=op)
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                conn.rollback()
+                DB_WRITE_ERRORS.inc(op=op)
+                raise
+            else:
+                conn.commit()
+            finally:
+                DB_WRITE_SECONDS.observe(time.perf_counter() - started, op=op)
+    
+    def close_all(self):
+        """Close idle connections (e.g. before deleting the database file)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
 
 
 class ResumeDatabase:
@@ -16,13 +149,23 @@ class ResumeDatabase:
     def __init__(self, db_path=DB_PATH):
         """Initialize database connection and create tables"""
         self.db_path = db_path
+        self.pool = ConnectionPool.for_path(db_path)
         self.init_db()
     
+    def connection(self):
+        """Borrow a pooled connection for ad-hoc reads"""
+        return self.pool.connection()
+    
+    def transaction(self, op="write"):
+        """Cursor inside one pooled write transaction"""
+        return self.pool.transaction(op)
+    
     def init_db(self):
         """Create database tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        
+        with self.transaction("init_db") as cur:
+            self._create_tables(cur)
+    
+    def _create_tables(self, cur):
         cur.execute("""
             CREATE TABLE IF NOT EXISTS roles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,6 +185,29 @@ class ResumeDatabase:
             )
         """)
         
+        # Migrate older databases: content hash of the PDF bytes
+        cur.execute("PRAGMA table_info(resumes)")
+        resume_columns = {row[1] for row in cur.fetchall()}
+        if "content_hash" not in resume_columns:
+            cur.execute("ALTER TABLE resumes ADD COLUMN content_hash TEXT")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_resumes_content_hash ON resumes(content_hash)")
+        
+        # Full extracted texts, compressed and stored once per distinct text; resumes
+        # point at theirs through text_hash so re-screening never needs the PDF
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS resume_texts (
+                text_hash TEXT PRIMARY KEY,
+                codec TEXT,
+                raw_size INTEGER,
+                data BLOB
+            )
+        """)
+        if "text_hash" not in resume_columns:
+            cur.execute("ALTER TABLE resumes ADD COLUMN text_hash TEXT")
+        if "full_text" in resume_columns:
+            # Databases that kept full texts uncompressed in resumes.full_text
+            self._migrate_full_texts(cur)
+        
         cur.execute("""
             CREATE TABLE IF NOT EXISTS results (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -56,88 +222,537 @@ class ResumeDatabase:
             )
         """)
         
-        conn.commit()
-        conn.close()
+        # Migrate older databases: per-resume exact skills and per-result semantic
+        # matches (with the threshold used), so role edits can be re-scored in place
+        if "exact_skills" not in resume_columns:
+            cur.execute("ALTER TABLE resumes ADD COLUMN exact_skills TEXT")
+        cur.execute("PRAGMA table_info(results)")
+        result_columns = {row[1] for row in cur.fetchall()}
+        if "semantic_skills" not in result_columns:
+            cur.execute("ALTER TABLE results ADD COLUMN semantic_skills TEXT")
+        if "semantic_threshold" not in result_columns:
+            cur.execute("ALTER TABLE results ADD COLUMN semantic_threshold REAL")
+        
+        if "job_id" not in result_columns:
+            cur.execute("ALTER TABLE results ADD COLUMN job_id INTEGER")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_results_job ON results(job_id)")
+        
+        # Background screening jobs with per-stage progress counters
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT,
+                role_id INTEGER,
+                status TEXT,
+                total INTEGER,
+                extracted INTEGER DEFAULT 0,
+                skilled INTEGER DEFAULT 0,
+                embedded INTEGER DEFAULT 0,
+                scored INTEGER DEFAULT 0,
+                error TEXT,
+                pid INTEGER,
+                created_at TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                FOREIGN KEY(role_id) REFERENCES roles(id)
+            )
+        """)
+        
+        # Ranking indexes: role filter plus the ORDER BY of get_results_for_role
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_results_role_rank
+            ON results(role_id, num_matched_skills DESC, similarity_score DESC, id DESC)
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_results_resume ON results(resume_id)")
+        
+        # Checkpoints of headless batch runs: one row per run, one per finished file
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS batch_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                source TEXT,
+                role_ids TEXT,
+                status TEXT,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS batch_run_files (
+                run_id INTEGER,
+                path TEXT,
+                done_at TEXT,
+                PRIMARY KEY (run_id, path),
+                FOREIGN KEY(run_id) REFERENCES batch_runs(id)
+            )
+        """)
+        
+        # Skill and role-text embeddings computed when a role is saved; skills_text
+        # and model_name tell whether they still match the role
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS role_embeddings (
+                role_id INTEGER PRIMARY KEY,
+                model_name TEXT,
+                skills_text TEXT,
+                dim INTEGER,
+                skill_vectors BLOB,
+                role_vector BLOB,
+                FOREIGN KEY(role_id) REFERENCES roles(id)
+            )
+        """)
+    
+    def _migrate_full_texts(self, cur, batch_size=500):
+        """Move texts from the old uncompressed resumes.full_text column into resume_texts"""
+        moved = 0
+        while True:
+            cur.execute("SELECT id, full_text FROM resumes WHERE full_text IS NOT NULL LIMIT ?", (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            hashes = self._put_texts(cur, [text for _, text in rows])
+            cur.executemany("UPDATE resumes SET text_hash=?, full_text=NULL WHERE id=?",
+                            [(h, rid) for h, (rid, _) in zip(hashes, rows)])
+            moved += len(rows)
+        if moved:
+            logger.info("Moved %d resume text(s) into compressed storage (VACUUM reclaims the freed space)", moved)
+    
+    @staticmethod
+    def _put_texts(cur, texts):
+        """Store each non-empty text once (content-addressed); returns their hashes, None for empty ones"""
+        hashes = [text_hash(text) if text else None for text in texts]
+        new = {h: text for h, text in zip(hashes, texts) if h}
+        if new:
+            known = set()
+            keys = list(new)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                cur.execute(f"SELECT text_hash FROM resume_texts WHERE text_hash IN ({','.join('?' * len(chunk))})",
+                            chunk)
+                known.update(row[0] for row in cur.fetchall())
+            rows = []
+            for h, text in new.items():
+                if h not in known:
+                    codec, blob = compress_text(text)
+                    rows.append((h, codec, len(text.encode("utf-8")), blob))
+            cur.executemany("INSERT INTO resume_texts (text_hash, codec, raw_size, data) VALUES (?, ?, ?, ?)", rows)
+        return hashes
     
     def add_role(self, name, skills_text):
-        """Add or update a role"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO roles (name, skills_text, created_at) VALUES (?, ?, ?)"
-            , (name, skills_text, datetime.now(timezone.utc).isoformat())
-        )
-        conn.commit()
-        conn.close()
+        """Add or update a role; an existing role keeps its id (and its results). Returns the id."""
+        with self.transaction("add_role") as cur:
+            cur.execute("SELECT id FROM roles WHERE name=?", (name,))
+            row = cur.fetchone()
+            if row:
+                cur.execute("UPDATE roles SET skills_text=? WHERE id=?", (skills_text, row[0]))
+                return row[0]
+            cur.execute(
+                "INSERT INTO roles (name, skills_text, created_at) VALUES (?, ?, ?)"
+                , (name, skills_text, datetime.now(timezone.utc).isoformat())
+            )
+            return cur.lastrowid
+    
+    def get_role_by_name(self, name):
+        """Get role by name"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT id FROM roles WHERE name=?", (name,)).fetchone()
+        return self.get_role(row[0]) if row else None
+    
+    def save_role_embeddings(self, role_id, model_name, skills_text, skill_vectors, role_vector):
+        """Store a role's skill embeddings (one row per skill) and role-text embedding"""
+        skill_vectors = np.ascontiguousarray(skill_vectors, dtype=np.float32)
+        role_vector = np.ascontiguousarray(role_vector, dtype=np.float32)
+        with self.transaction("save_role_embeddings") as cur:
+            cur.execute(
+                """INSERT OR REPLACE INTO role_embeddings (role_id, model_name, skills_text, dim, skill_vectors, role_vector)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (role_id, model_name, skills_text, int(role_vector.shape[0]), skill_vectors.tobytes(), role_vector.tobytes())
+            )
+    
+    def get_role_embeddings(self, role_ids, model_name):
+        """
+        Get {role_id: (skill_vectors, role_vector)} for roles whose stored embeddings
+        were computed with model_name for the role's current skills.
+        """
+        role_ids = [int(r) for r in role_ids]
+        if not role_ids:
+            return {}
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"""SELECT e.role_id, e.dim, e.skill_vectors, e.role_vector
+                    FROM role_embeddings e JOIN roles ro ON ro.id = e.role_id
+                    WHERE e.role_id IN ({','.join('?' * len(role_ids))})
+                      AND e.model_name = ? AND e.skills_text IS ro.skills_text""",
+                role_ids + [model_name]
+            ).fetchall()
+        found = {}
+        for role_id, dim, skill_blob, role_blob in rows:
+            skill_vectors = np.frombuffer(skill_blob, dtype=np.float32).reshape(-1, dim)
+            found[role_id] = (skill_vectors, np.frombuffer(role_blob, dtype=np.float32, count=dim))
+        return found
     
     def get_role(self, role_id):
         """Get role by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, skills_text FROM roles WHERE id=?", (role_id,))
-        row = cur.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute("SELECT id, name, skills_text FROM roles WHERE id=?", (role_id,)).fetchone()
         
         if not row:
             return None
         
         skills = [s.strip() for s in row[2].split(";") if s.strip()]
-        return {"id": row[0], "name": row[1], "skills": skills}
+        return {"id": row[0], "name": row[1], "skills": skills, "skills_text": row[2]}
+    
+    def get_roles(self, role_ids=None):
+        """Get several roles (all roles by default) with their skill lists"""
+        query = "SELECT id, name, skills_text FROM roles"
+        params = []
+        if role_ids is not None:
+            role_ids = [int(r) for r in role_ids]
+            if not role_ids:
+                return []
+            query += f" WHERE id IN ({','.join('?' * len(role_ids))})"
+            params = role_ids
+        with self.connection() as conn:
+            rows = conn.execute(query + " ORDER BY id", params).fetchall()
+        return [{"id": row[0], "name": row[1], "skills": [s.strip() for s in (row[2] or "").split(";") if s.strip()],
+                 "skills_text": row[2]} for row in rows]
     
     def list_roles(self):
         """Get all roles as DataFrame"""
-        conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql("SELECT * FROM roles ORDER BY id", conn)
-        conn.close()
-        return df
+        import pandas as pd
+        with self.connection() as conn:
+            return pd.read_sql("SELECT * FROM roles ORDER BY id", conn)
     
     def delete_role(self, role_id):
         """Delete role and associated results"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM results WHERE role_id=?", (role_id,))
-        cur.execute("DELETE FROM roles WHERE id=?", (role_id,))
-        conn.commit()
-        conn.close()
-    
-    def add_resume(self, pdf_path, text_snippet, extraction_method):
-        """Add resume to database"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO resumes (pdf_path, text_snippet, extraction_method, extracted_at) VALUES (?, ?, ?, ?)"
-            , (pdf_path, text_snippet[:1000], extraction_method, datetime.now(timezone.utc).isoformat())
-        )
-        resume_id = cur.lastrowid
-        conn.commit()
-        conn.close()
-        return resume_id
+        with self.transaction("delete_role") as cur:
+            cur.execute("DELETE FROM results WHERE role_id=?", (role_id,))
+            cur.execute("DELETE FROM role_embeddings WHERE role_id=?", (role_id,))
+            cur.execute("DELETE FROM roles WHERE id=?", (role_id,))
+    
+    def start_batch_run(self, name, source, role_ids, restart=False):
+        """
+        Get or create the checkpoint of a named batch run. An existing run keeps
+        its finished files (so it resumes) unless restart is set.
+        Returns {id, name, source, role_ids, status, resumed}.
+        """
+        role_ids_text = ",".join(str(r) for r in role_ids) if role_ids is not None else None
+        now = datetime.now(timezone.utc).isoformat()
+        with self.transaction("start_batch_run") as cur:
+            cur.execute("SELECT id, source, role_ids FROM batch_runs WHERE name=?", (name,))
+            row = cur.fetchone()
+            if row and restart:
+                cur.execute("DELETE FROM batch_run_files WHERE run_id=?", (row[0],))
+            if row:
+                cur.execute("UPDATE batch_runs SET status='running', finished_at=NULL WHERE id=?", (row[0],))
+                run_id, source, role_ids_text = row[0], row[1], row[2]
+            else:
+                cur.execute(
+                    "INSERT INTO batch_runs (name, source, role_ids, status, started_at) VALUES (?, ?, ?, 'running', ?)",
+                    (name, source, role_ids_text, now)
+                )
+                run_id = cur.lastrowid
+        return {
+            "id": run_id,
+            "name": name,
+            "source": source,
+            "role_ids": [int(r) for r in role_ids_text.split(",")] if role_ids_text else None,
+            "status": "running",
+            "resumed": bool(row) and not restart
+        }
+    
+    def batch_run_done_paths(self, run_id):
+        """Paths a batch run has already finished"""
+        with self.connection() as conn:
+            return {row[0] for row in conn.execute("SELECT path FROM batch_run_files WHERE run_id=?", (run_id,))}
+    
+    def mark_batch_run_files(self, run_id, paths):
+        """Checkpoint finished paths of a batch run"""
+        with self.transaction("mark_batch_run_files") as cur:
+            self._mark_batch_run_files(cur, run_id, paths)
+    
+    @staticmethod
+    def _mark_batch_run_files(cur, run_id, paths):
+        now = datetime.now(timezone.utc).isoformat()
+        cur.executemany("INSERT OR IGNORE INTO batch_run_files (run_id, path, done_at) VALUES (?, ?, ?)",
+                        [(run_id, path, now) for path in paths])
+    
+    def finish_batch_run(self, run_id, status="finished"):
+        """Mark a batch run finished (or failed / interrupted)"""
+        with self.transaction("finish_batch_run") as cur:
+            cur.execute("UPDATE batch_runs SET status=?, finished_at=? WHERE id=?",
+                        (status, datetime.now(timezone.utc).isoformat(), run_id))
+    
+    def create_job(self, kind, role_id, total):
+        """Queue a background job owned by this process; returns its id"""
+        with self.transaction("create_job") as cur:
+            cur.execute(
+                "INSERT INTO jobs (kind, role_id, status, total, pid, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (kind, role_id, int(total), os.getpid(), datetime.now(timezone.utc).isoformat())
+            )
+            return cur.lastrowid
+    
+    def set_job_status(self, job_id, status, error=None):
+        """Move a job to running / finished / failed, stamping the start or finish time"""
+        now = datetime.now(timezone.utc).isoformat()
+        column = "started_at" if status == "running" else "finished_at"
+        with self.transaction("set_job_status") as cur:
+            cur.execute(f"UPDATE jobs SET status=?, error=?, {column}=? WHERE id=?", (status, error, now, job_id))
+    
+    def add_job_progress(self, job_id, stage, count):
+        """Add count to one of the job's stage counters (extracted, skilled, embedded, scored)"""
+        if stage not in ("extracted", "skilled", "embedded", "scored"):
+            raise ValueError(f"Unknown job stage: {stage}")
+        with self.transaction("add_job_progress") as cur:
+            cur.execute(f"UPDATE jobs SET {stage} = {stage} + ? WHERE id=?", (int(count), job_id))
+    
+    def get_job(self, job_id):
+        """Get a job's status and progress counters as a dict"""
+        with self.connection() as conn:
+            cur = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,))
+            row = cur.fetchone()
+        return dict(zip([col[0] for col in cur.description], row)) if row else None
+    
+    def list_jobs(self, statuses=None, limit=20):
+        """Most recent jobs first, optionally only those in the given statuses"""
+        query = "SELECT id FROM jobs"
+        params = []
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+        with self.connection() as conn:
+            job_ids = [row[0] for row in conn.execute(query, params)]
+        return [self.get_job(job_id) for job_id in job_ids]
+    
+    def fail_orphaned_jobs(self, is_alive):
+        """Mark queued/running jobs whose owning process is gone as interrupted; returns how many"""
+        with self.transaction("fail_orphaned_jobs") as cur:
+            cur.execute("SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')")
+            orphaned = [job_id for job_id, pid in cur.fetchall() if not is_alive(pid)]
+            cur.executemany(
+                "UPDATE jobs SET status='interrupted', error='server restarted', finished_at=? WHERE id=?",
+                [(datetime.now(timezone.utc).isoformat(), job_id) for job_id in orphaned]
+            )
+        return len(orphaned)
+    
+    def count_rows(self, table):
+        """Number of rows in one of the system's tables"""
+        if table not in ("roles", "resumes", "results"):
+            raise ValueError(f"Unknown table: {table}")
+        with self.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    
+    def add_resume(self, pdf_path, text, extraction_method, content_hash=None):
+        """Add resume to database; its full text is stored compressed, the content hash enables reuse"""
+        return self.add_resumes([(pdf_path, text, extraction_method, content_hash)])[0]
+    
+    def add_resumes(self, rows):
+        """
+        Add many resumes in one transaction.
+        rows: iterable of (pdf_path, text, extraction_method, content_hash); returns the new ids in order.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [(pdf_path, text or "", method, content_hash) for pdf_path, text, method, content_hash in rows]
+        resume_ids = []
+        with self.transaction("add_resumes") as cur:
+            hashes = self._put_texts(cur, [text for _, text, _, _ in rows])
+            # One statement per row to collect lastrowid; still a single commit/fsync
+            for (pdf_path, text, extraction_method, content_hash), t_hash in zip(rows, hashes):
+                cur.execute(
+                    """INSERT INTO resumes (pdf_path, text_snippet, extraction_method, extracted_at, content_hash, text_hash)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (pdf_path, text[:1000], extraction_method, now, content_hash, t_hash)
+                )
+                resume_ids.append(cur.lastrowid)
+        return resume_ids
     
     def get_resume(self, resume_id):
         """Get resume by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT pdf_path, text_snippet FROM resumes WHERE id=?", (resume_id,))
-        row = cur.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute("SELECT pdf_path, text_snippet FROM resumes WHERE id=?", (resume_id,)).fetchone()
         return row if row else None
     
+    def get_resumes(self, resume_ids):
+        """Get {id: {pdf_path, extraction_method}} for several resumes in one query"""
+        resume_ids = [int(r) for r in resume_ids]
+        found = {}
+        with self.connection() as conn:
+            for start in range(0, len(resume_ids), 500):
+                chunk = resume_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT id, pdf_path, extraction_method FROM resumes WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for rid, pdf_path, method in rows:
+                    found[rid] = {"pdf_path": pdf_path, "extraction_method": method}
+        return found
+    
+    def iter_resume_texts(self, batch_size=256):
+        """Yield (resume_id, full_text) batches for every resume with a stored full text, decompressing one batch at a time"""
+        last_id = 0
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    """SELECT re.id, t.codec, t.data FROM resumes re JOIN resume_texts t ON t.text_hash = re.text_hash
+                       WHERE re.id > ? ORDER BY re.id LIMIT ?""",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(rid, decompress_text(codec, data)) for rid, codec, data in rows]
+    
+    def resume_ids_with_text(self):
+        """Ids of every resume whose full text is stored, oldest first"""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT id FROM resumes WHERE text_hash IS NOT NULL ORDER BY id")]
+    
+    def get_stored_resumes(self, resume_ids):
+        """
+        Everything needed to re-screen resumes without their PDFs, in the order of resume_ids:
+        dicts of id, pdf_path, extraction_method, exact_skills and the decompressed text.
+        Resumes without a stored text are left out.
+        """
+        resume_ids = [int(r) for r in resume_ids]
+        found = {}
+        with self.connection() as conn:
+            for start in range(0, len(resume_ids), 500):
+                chunk = resume_ids[start:start + 500]
+                rows = conn.execute(
+                    f"""SELECT re.id, re.pdf_path, re.extraction_method, re.exact_skills, t.codec, t.data
+                        FROM resumes re JOIN resume_texts t ON t.text_hash = re.text_hash
+                        WHERE re.id IN ({','.join('?' * len(chunk))})""",
+                    chunk
+                )
+                for rid, pdf_path, method, exact_skills, codec, data in rows:
+                    found[rid] = {"id": rid, "pdf_path": pdf_path, "extraction_method": method,
+                                  "exact_skills": exact_skills, "codec": codec, "data": data}
+        stored = []
+        for rid in dict.fromkeys(resume_ids):
+            if rid in found:
+                row = found[rid]
+                row["text"] = decompress_text(row.pop("codec"), row.pop("data"))
+                stored.append(row)
+        return stored
+    
+    def text_storage_stats(self):
+        """Distinct stored texts with their raw and compressed sizes in bytes"""
+        with self.connection() as conn:
+            texts, raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM resume_texts"
+            ).fetchone()
+            resumes = conn.execute("SELECT COUNT(*) FROM resumes WHERE text_hash IS NOT NULL").fetchone()[0]
+        return {"resumes": resumes, "texts": texts, "raw_bytes": raw, "stored_bytes": stored,
+                "ratio": raw / stored if stored else 0.0}
+    
+    def find_resume_by_hash(self, content_hash):
+        """Get a previously extracted resume by SHA-256 of its PDF bytes"""
+        with self.connection() as conn:
+            row = conn.execute(
+                """SELECT re.id, t.codec, t.data, re.extraction_method
+                   FROM resumes re JOIN resume_texts t ON t.text_hash = re.text_hash
+                   WHERE re.content_hash=? ORDER BY re.id LIMIT 1""",
+                (content_hash,)
+            ).fetchone()
+        
+        if not row:
+            return None
+        return {"id": row[0], "text": decompress_text(row[1], row[2]), "extraction_method": row[3]}
+    
     def add_result(self, role_id, resume_id, matched_skills, num_matched, similarity_score):
         """Add screening result"""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            """INSERT INTO results (role_id, resume_id, matched_skills, num_matched_skills, similarity_score, created_at)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (role_id, resume_id, matched_skills, num_matched, similarity_score, datetime.now(timezone.utc).isoformat())
-        )
-        conn.commit()
-        conn.close()
-    
-    def get_results_for_role(self, role_id, top_n=None):
-        """Get screening results for a role"""
-        conn = sqlite3.connect(self.db_path)
-        query = f"""
+        self.add_results([(role_id, resume_id, matched_skills, num_matched, similarity_score)])
+    
+    def add_results(self, rows, checkpoint=None, replace=False):
+        """
+        Add many screening results in one transaction.
+        rows: iterable of (role_id, resume_id, matched_skills, num_matched, similarity_score),
+        optionally followed by (semantic_skills, semantic_threshold, job_id).
+        checkpoint: optional (run_id, paths) of a batch run, marked done in the same
+        transaction so a run killed mid-batch never re-adds results it already stored.
+        replace: delete the existing results of each (role_id, resume_id) pair first.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        params = []
+        for row in rows:
+            role_id, resume_id, matched, num, score = row[:5]
+            semantic, threshold, job_id = (tuple(row[5:8]) + (None, None, None))[:3]
+            params.append((role_id, resume_id, matched, num, float(score), now, semantic, threshold, job_id))
+        with self.transaction("add_results") as cur:
+            if replace:
+                cur.executemany("DELETE FROM results WHERE role_id=? AND resume_id=?",
+                                list(dict.fromkeys((p[0], p[1]) for p in params)))
+            cur.executemany(
+                """INSERT INTO results (role_id, resume_id, matched_skills, num_matched_skills, similarity_score, created_at,
+                                        semantic_skills, semantic_threshold, job_id)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                params
+            )
+            if checkpoint is not None:
+                self._mark_batch_run_files(cur, *checkpoint)
+    
+    def get_result_rows(self, role_id):
+        """Raw result rows of a role joined with the resume's exact skills, for in-place re-scoring"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                """SELECT r.id, r.resume_id, r.matched_skills, r.semantic_skills, r.semantic_threshold, r.similarity_score,
+                          re.exact_skills
+                   FROM results r JOIN resumes re ON r.resume_id = re.id
+                   WHERE r.role_id = ?""",
+                (role_id,)
+            ).fetchall()
+        keys = ("result_id", "resume_id", "matched_skills", "semantic_skills", "semantic_threshold", "similarity_score",
+                "exact_skills")
+        return [dict(zip(keys, row)) for row in rows]
+    
+    def update_results(self, rows):
+        """
+        Re-score results in place, in one transaction.
+        rows: iterable of (result_id, matched_skills, num_matched, similarity_score, semantic_skills).
+        """
+        with self.transaction("update_results") as cur:
+            cur.executemany(
+                """UPDATE results SET matched_skills=?, num_matched_skills=?, similarity_score=?, semantic_skills=?
+                   WHERE id=?""",
+                [(matched, num, float(score), semantic, result_id)
+                 for result_id, matched, num, score, semantic in rows]
+            )
+    
+    def set_exact_skills(self, rows):
+        """Store each resume's exact skill matches; rows: iterable of (resume_id, skills_text)"""
+        with self.transaction("set_exact_skills") as cur:
+            cur.executemany("UPDATE resumes SET exact_skills=? WHERE id=?",
+                            [(skills_text, resume_id) for resume_id, skills_text in rows])
+    
+    def get_results_for_job(self, job_id):
+        """Results a background job has written so far, best first"""
+        import pandas as pd
+        query = """
+            SELECT 
+                r.id as result_id,
+                r.resume_id,
+                re.pdf_path,
+                r.matched_skills,
+                r.num_matched_skills,
+                r.similarity_score,
+                re.extraction_method,
+                r.created_at
+            FROM results r
+            JOIN resumes re ON r.resume_id = re.id
+            WHERE r.job_id = ?
+            ORDER BY r.num_matched_skills DESC, r.similarity_score DESC, r.id DESC
+        """
+        with self.connection() as conn:
+            return pd.read_sql(query, conn, params=[job_id])
+    
+    def get_results_for_role(self, role_id, top_n=None, offset=0, after=None):
+        """
+        Get screening results for a role, best first.
+        Page with top_n + offset, or (cheaper on deep pages) with keyset pagination:
+        pass the last row's (num_matched_skills, similarity_score, result_id) as after.
+        """
+        query = """
             SELECT 
                 r.id as result_id,
                 ro.name as role_name,
@@ -150,12 +765,21 @@ class ResumeDatabase:
             FROM results r
             JOIN roles ro ON r.role_id = ro.id
             JOIN resumes re ON r.resume_id = re.id
-            WHERE r.role_id = {{role_id}}
-            ORDER BY r.num_matched_skills DESC, r.similarity_score DESC
+            WHERE r.role_id = ?
         """
+        params = [role_id]
+        if after is not None:
+            query += " AND (r.num_matched_skills, r.similarity_score, r.id) < (?, ?, ?)"
+            params.extend([int(after[0]), float(after[1]), int(after[2])])
+        # Matches idx_results_role_rank, so ranking is an index walk rather than a sort
+        query += " ORDER BY r.num_matched_skills DESC, r.similarity_score DESC, r.id DESC"
         if top_n:
-            query += f" LIMIT {{top_n}}"
+            query += " LIMIT ? OFFSET ?"
+            params.extend([int(top_n), int(offset or 0)])
+        elif offset:
+            query += " LIMIT -1 OFFSET ?"
+            params.append(int(offset))
         
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
\ No newline at end of file
+        import pandas as pd
+        with self.connection() as conn:
+            return pd.read_sql(query, conn, params=params)
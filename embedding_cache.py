@@ -0,0 +1,107 @@
+"""
+Persistent content-addressed cache for resume embeddings
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import hashlib
+import time
+import numpy as np
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, SENTENCE_TRANSFORMER_MODEL
+from database import ConnectionPool
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially re-flowed copies of a resume share one entry"""
+    return " ".join((text or "").split())
+
+
+def embedding_key(text, model_name=SENTENCE_TRANSFORMER_MODEL):
+    """SHA-256 of the model name and the normalized text"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding store with a size cap and least-recently-used eviction"""
+
+    def __init__(self, cache_path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.pool = ConnectionPool.for_path(cache_path)
+        self.init_db()
+
+    def init_db(self):
+        """Create the cache table if it doesn't exist"""
+        with self.pool.transaction("embedding_cache.init_db") as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dim INTEGER,
+                    vector BLOB,
+                    last_used REAL
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys present in the cache and mark them as recently used"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        with self.pool.connection() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+                for key, dim, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+
+        if found:
+            now = time.time()
+            with self.pool.transaction("embedding_cache.get_many") as cur:
+                cur.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k in found])
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict the least recently used entries over the cap"""
+        items = list(items)
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            rows.append((key, int(vector.shape[0]), vector.tobytes(), now))
+
+        with self.pool.transaction("embedding_cache.put_many") as cur:
+            cur.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)", rows)
+            self._evict(cur)
+
+    def _evict(self, cur):
+        if not self.max_entries:
+            return
+        cur.execute("SELECT COUNT(*) FROM embeddings")
+        excess = cur.fetchone()[0] - self.max_entries
+        if excess > 0:
+            cur.execute("""
+                DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                )
+            """, (excess,))
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        """Drop every cached embedding"""
+        with self.pool.transaction("embedding_cache.clear") as cur:
+            cur.execute("DELETE FROM embeddings")
@@ -0,0 +1,142 @@
+"""
+Sentence encoder backends (fp32 torch, int8-quantized torch, ONNX Runtime)
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import re
+import time
+import numpy as np
+from config import SENTENCE_TRANSFORMER_MODEL, ENCODER_BACKEND, DEFAULT_SEMANTIC_THRESHOLD, SKILLS_DB
+
+# Every backend returns a SentenceTransformer-compatible object (encode() and
+# get_sentence_embedding_dimension()) built from the same locally cached model.
+
+
+def _load_torch(model_name, device=None):
+    # Imported here: sentence_transformers pulls in torch, which takes seconds
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def _load_torch_int8(model_name):
+    """fp32 model with every nn.Linear dynamically quantized to int8 (weights int8, activations quantized per batch)"""
+    import torch
+    # Dynamic quantization only has CPU kernels
+    model = _load_torch(model_name, device="cpu")
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# SentenceTransformer(..., backend="onnx") first appeared in this release
+ONNX_MIN_SENTENCE_TRANSFORMERS = (3, 2)
+
+
+def _version_tuple(version):
+    """(major, minor) of a version string such as '3.2.1' or '3.2rc1'"""
+    return tuple(int(m.group()) if (m := re.match(r"\d+", part)) else 0 for part in (version.split(".") + ["0"])[:2])
+
+
+def _load_onnx(model_name):
+    """ONNX Runtime export of the model (needs sentence-transformers[onnx] >= 3.2, i.e. optimum + onnxruntime)"""
+    import sentence_transformers
+    if _version_tuple(sentence_transformers.__version__) < ONNX_MIN_SENTENCE_TRANSFORMERS:
+        raise ImportError(f"The 'onnx' encoder backend needs sentence-transformers>=3.2 "
+                          f"(found {sentence_transformers.__version__}): pip install -U 'sentence-transformers[onnx]'")
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The 'onnx' encoder backend needs onnxruntime: pip install 'sentence-transformers[onnx]'") from e
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu", backend="onnx")
+
+
+ENCODER_BACKENDS = {
+    "torch": _load_torch,
+    "torch-int8": _load_torch_int8,
+    "onnx": _load_onnx,
+}
+
+
+def encoder_loader(backend=ENCODER_BACKEND):
+    """Loader function (model_name -> encoder) for a backend name"""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (choose from {', '.join(ENCODER_BACKENDS)})")
+    return ENCODER_BACKENDS[backend]
+
+
+def model_tag(model_name=SENTENCE_TRANSFORMER_MODEL, backend=ENCODER_BACKEND):
+    """
+    Name stored with cached and indexed embeddings. Non-fp32 backends get their
+    own tag so their (slightly different) vectors never mix with fp32 ones.
+    """
+    return model_name if backend == "torch" else f"{model_name}+{backend}"
+
+
+def _encode(model, texts, batch_size=32):
+    vectors = model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _top_k_overlap(reference, candidate, k):
+    """Mean share of each row's top-k columns that both score matrices agree on"""
+    k = min(k, reference.shape[1])
+    if k == 0:
+        return 1.0
+    ref_top = np.argsort(-reference, axis=1)[:, :k]
+    cand_top = np.argsort(-candidate, axis=1)[:, :k]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]))
+
+
+def parity_report(texts, backend, reference="torch", model_name=SENTENCE_TRANSFORMER_MODEL, queries=None,
+                  threshold=DEFAULT_SEMANTIC_THRESHOLD, top_k=10):
+    """
+    Compare a backend against the reference (fp32) on a sample corpus.
+    queries (default: SKILLS_DB) are scored against texts with both encoders;
+    reports vector agreement, score drift, threshold flips, top-k ranking
+    overlap and encode speed.
+    """
+    texts = [t for t in texts if t and t.strip()]
+    if not texts:
+        raise ValueError("Parity check needs at least one non-empty text")
+    queries = list(queries or SKILLS_DB)
+
+    report = {"backend": backend, "reference": reference, "texts": len(texts), "queries": len(queries)}
+    scores = {}
+    vectors = {}
+    for name in (reference, backend):
+        model = encoder_loader(name)(model_name)
+        _encode(model, texts[:2])  # first call pays one-off setup costs
+        started = time.perf_counter()
+        vectors[name] = _encode(model, texts)
+        report[f"{name}_seconds"] = time.perf_counter() - started
+        scores[name] = _encode(model, queries) @ vectors[name].T
+
+    ref, cand = scores[reference], scores[backend]
+    drift = np.abs(ref - cand)
+    report["vector_cosine_mean"] = float(np.mean(np.sum(vectors[reference] * vectors[backend], axis=1)))
+    report["vector_cosine_min"] = float(np.min(np.sum(vectors[reference] * vectors[backend], axis=1)))
+    report["score_drift_mean"] = float(drift.mean())
+    report["score_drift_max"] = float(drift.max())
+    report["threshold_flips"] = float(np.mean((ref >= threshold) != (cand >= threshold)))
+    report[f"top{top_k}_overlap"] = _top_k_overlap(ref, cand, top_k)
+    report["speedup"] = report[f"{reference}_seconds"] / max(report[f"{backend}_seconds"], 1e-9)
+    return report
+
+
+def print_parity_report(report):
+    print(f"[INFO] Encoder parity: {report['backend']} vs {report['reference']} "
+          f"({report['texts']} text(s), {report['queries']} quer(ies))")
+    for key, value in report.items():
+        if key not in ("backend", "reference", "texts", "queries"):
+            print(f"[INFO]   {key:<20} {value:.4f}")
+
+
+if __name__ == "__main__":
+    sample = [
+        "Senior Python developer with Django, PostgreSQL and Docker experience",
+        "Data scientist: pandas, scikit-learn, deep learning with PyTorch",
+        "Frontend engineer building React and TypeScript single-page apps",
+        "DevOps engineer running Kubernetes and Terraform on AWS",
+    ]
+    print_parity_report(parity_report(sample, "torch-int8"))
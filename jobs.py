@@ -0,0 +1,123 @@
+"""
+Background screening jobs with progress stored in the database
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_WORKERS, JOB_BATCH_SIZE, DEFAULT_SEMANTIC_THRESHOLD
+
+JOB_STAGES = ("extracted", "skilled", "embedded", "scored")
+
+logger = logging.getLogger(__name__)
+
+
+def _pid_alive(pid):
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """
+    Runs screening jobs on a small thread pool so the caller (e.g. a Streamlit
+    session) returns immediately. Each job screens its files in micro-batches
+    of batch_size; every finished stage bumps the job's counters in the jobs
+    table and every finished batch's results are stored right away, so
+    progress and partial results can be polled from any session.
+    """
+
+    def __init__(self, screener, max_workers=JOB_WORKERS, batch_size=JOB_BATCH_SIZE):
+        self.screener = screener
+        self.db = screener.db
+        self.batch_size = max(1, batch_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screening-job")
+        # Jobs left queued/running by a process that no longer exists will never finish
+        orphaned = self.db.fail_orphaned_jobs(_pid_alive)
+        if orphaned:
+            logger.warning("Marked %d orphaned job(s) as interrupted", orphaned)
+
+    def submit_screening(self, role_id, pdf_sources, pdf_names=None, semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD,
+                         skip_missing=True):
+        """Queue a screening job and return its id at once; sources are paths or PDF bytes"""
+        if not self.db.get_role(role_id):
+            raise ValueError(f"Role id {role_id} not found")
+        pdf_sources = list(pdf_sources)
+        pdf_names = list(pdf_names) if pdf_names else None
+        job_id = self.db.create_job("screen", role_id, len(pdf_sources))
+        self._executor.submit(self._run_screening, job_id, role_id, pdf_sources, pdf_names,
+                              semantic_threshold, skip_missing)
+        logger.info("Job %d queued: %d resume(s) for role %d", job_id, len(pdf_sources), role_id,
+                    extra={"job_id": job_id, "role_id": role_id, "files": len(pdf_sources)})
+        return job_id
+
+    def submit_rescreen(self, role_id, resume_ids=None, semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD):
+        """Queue a job re-screening stored resumes (all by default) from their stored texts; returns its id"""
+        if not self.db.get_role(role_id):
+            raise ValueError(f"Role id {role_id} not found")
+        resume_ids = self.db.resume_ids_with_text() if resume_ids is None else list(resume_ids)
+        job_id = self.db.create_job("rescreen", role_id, len(resume_ids))
+        self._executor.submit(self._run_rescreen, job_id, role_id, resume_ids, semantic_threshold)
+        logger.info("Job %d queued: re-screening %d stored resume(s) for role %d", job_id, len(resume_ids), role_id,
+                    extra={"job_id": job_id, "role_id": role_id, "resumes": len(resume_ids)})
+        return job_id
+
+    def _run_screening(self, job_id, role_id, pdf_sources, pdf_names, semantic_threshold, skip_missing):
+        self.db.set_job_status(job_id, "running")
+        try:
+            # Each micro-batch is stored as soon as it is scored; nothing to collect here
+            for _ in self.screener.iter_screen_resumes(
+                role_id,
+                pdf_sources,
+                semantic_threshold=semantic_threshold,
+                skip_missing=skip_missing,
+                pdf_names=pdf_names,
+                batch_size=self.batch_size,
+                progress=lambda stage, count: self.db.add_job_progress(job_id, stage, count),
+                job_id=job_id
+            ):
+                pass
+        except Exception as e:
+            self.db.set_job_status(job_id, "failed", error=str(e))
+            logger.exception("Job %d failed: %s", job_id, e, extra={"job_id": job_id})
+        else:
+            self.db.set_job_status(job_id, "finished")
+            logger.info("Job %d finished", job_id, extra={"job_id": job_id})
+
+    def _run_rescreen(self, job_id, role_id, resume_ids, semantic_threshold):
+        self.db.set_job_status(job_id, "running")
+        try:
+            self.screener.rescreen_resumes(
+                role_id,
+                resume_ids,
+                semantic_threshold=semantic_threshold,
+                batch_size=self.batch_size,
+                progress=lambda stage, count: self.db.add_job_progress(job_id, stage, count),
+                job_id=job_id
+            )
+        except Exception as e:
+            self.db.set_job_status(job_id, "failed", error=str(e))
+            logger.exception("Job %d failed: %s", job_id, e, extra={"job_id": job_id})
+        else:
+            self.db.set_job_status(job_id, "finished")
+            logger.info("Job %d finished", job_id, extra={"job_id": job_id})
+
+    def get_job(self, job_id):
+        return self.db.get_job(job_id)
+
+    def active_jobs(self):
+        """Queued and running jobs, newest first"""
+        return self.db.list_jobs(statuses=("queued", "running"))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -5,15 +5,18 @@ Date: 2025-11-09
 Usage: streamlit run app.py
 """
 
+import json
+import threading
+import time
 import streamlit as st
 import pandas as pd
 from pathlib import Path
-import tempfile
-import os
 from screening_engine import ResumeScreener
-from database import ResumeDatabase
+from jobs import JobRunner
+from metrics import start_http_server
+from profiling import list_profiles, load_profile
+from config import WARM_UP_ON_START, JOB_POLL_SECONDS
 import plotly.express as px
-import sqlite3
 
 # Page configuration
 st.set_page_config(
@@ -42,11 +45,105 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'screener' not in st.session_state:
-    st.session_state.screener = ResumeScreener()
+
+@st.cache_resource
+def get_screener():
+    """
+    One screener (and one copy of each model) per server process, shared by every
+    session. Models load lazily; with WARM_UP_ON_START they load in the background
+    so read-only pages render immediately.
+    """
+    screener = ResumeScreener()
+    if WARM_UP_ON_START:
+        threading.Thread(target=screener.warm_up, name="warm-up", daemon=True).start()
+    # /metrics on METRICS_PORT, if set; one server per process like the screener
+    start_http_server()
+    return screener
+
+
+screener = get_screener()
+
+
+@st.cache_resource
+def get_job_runner():
+    """Background job pool, shared by every session like the screener"""
+    return JobRunner(get_screener())
+
+
+job_runner = get_job_runner()
+
+# Initialize session state (per-session: results and UI only)
 if 'results' not in st.session_state:
     st.session_state.results = None
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
+
+def show_screening_results(results_df):
+    """Top candidates, detailed table and charts for a set of screening results"""
+    st.subheader("📊 Screening Results")
+    st.markdown("### 🏆 Top Candidates")
+    top_3 = results_df.head(3)
+    
+    cols = st.columns(min(3, len(top_3)))
+    for idx, (i, row) in enumerate(top_3.iterrows()):
+        with cols[idx]:
+            st.metric(f"Rank {idx + 1}", 
+                     f"{row['num_matched_skills']} skills",
+                     f"{row['similarity_score']:.2%} match")
+            st.caption(f"Resume ID: {row['resume_id']}")
+    
+    st.markdown("---")
+    st.markdown("### 📋 Detailed Results")
+    display_cols = ['resume_id', 'num_matched_skills', 'similarity_score', 
+                  'matched_skills', 'extraction_method']
+    st.dataframe(results_df[display_cols], use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(results_df, x='resume_id', y='num_matched_skills',
+                   title='Skills Matched per Resume')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        fig = px.scatter(results_df, x='num_matched_skills', y='similarity_score',
+                       size='num_matched_skills', title='Skills vs Similarity Score')
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# Re-run just the job panel every couple of seconds where st.fragment exists;
+# older Streamlit versions fall back to rerunning the page while a job is active
+_fragment = getattr(st, "fragment", None)
+_poll = _fragment(run_every=JOB_POLL_SECONDS) if _fragment else (lambda f: f)
+
+
+@_poll
+def show_job(job_id):
+    """Live status, per-stage progress and the results a background job has stored so far"""
+    job = job_runner.get_job(job_id)
+    if not job:
+        return
+    active = job["status"] in ("queued", "running")
+    
+    st.subheader(f"⏳ Screening job #{job_id}: {job['status']}")
+    total = max(job["total"], 1)
+    for stage, label in (("extracted", "Text extraction"), ("skilled", "Skill extraction"),
+                         ("embedded", "Embedding"), ("scored", "Scoring")):
+        st.progress(min(job[stage] / total, 1.0), text=f"{label}: {job[stage]}/{job['total']}")
+    if job["status"] == "failed":
+        st.error(f"Job failed: {job['error']}")
+    elif job["status"] == "interrupted":
+        st.warning(f"Job interrupted: {job['error']}")
+    
+    results_df = screener.db.get_results_for_job(job_id)
+    if not results_df.empty:
+        if job["status"] == "finished":
+            st.success(f"✅ Successfully screened {len(results_df)} resume(s)!")
+        show_screening_results(results_df)
+    
+    if active and not _fragment:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 
 # Header
 st.markdown('<div class="main-header">🎯 AI Resume Screening System</div>', unsafe_allow_html=True)
@@ -71,28 +168,17 @@ if page == "🏠 Home":
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Roles", len(st.session_state.screener.db.list_roles()))
+        st.metric("Total Roles", len(screener.db.list_roles()))
     
     with col2:
-        db = ResumeDatabase()
-        conn = sqlite3.connect(db.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM resumes")
-        resume_count = cursor.fetchone()[0]
-        conn.close()
-        st.metric("Resumes Processed", resume_count)
+        st.metric("Resumes Processed", screener.db.count_rows("resumes"))
     
     with col3:
-        conn = sqlite3.connect(db.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM results")
-        result_count = cursor.fetchone()[0]
-        conn.close()
-        st.metric("Screening Results", result_count)
+        st.metric("Screening Results", screener.db.count_rows("results"))
     
     st.markdown("---")
     st.subheader("📋 Available Job Roles")
-    roles_df = st.session_state.screener.db.list_roles()
+    roles_df = screener.db.list_roles()
     
     if not roles_df.empty:
         display_df = roles_df[['id', 'name', 'skills_text', 'created_at']].copy()
@@ -117,7 +203,7 @@ elif page == "➕ Add Role":
             if role_name and job_description:
                 with st.spinner("Extracting skills using NLP..."):
                     try:
-                        skills = st.session_state.screener.add_role_from_text(role_name, job_description)
+                        skills = screener.add_role_from_text(role_name, job_description)
                         st.success(f"✅ Role '{role_name}' added successfully!")
                         st.info(f"**Extracted {len(skills)} skills:** {', '.join(skills)}")
                     except Exception as e:
@@ -136,7 +222,7 @@ elif page == "➕ Add Role":
                 with st.spinner("Adding role..."):
                     try:
                         skills_list = [s.strip() for s in manual_skills.split(',')]
-                        st.session_state.screener.add_role_manual(manual_role_name, skills_list)
+                        screener.add_role_manual(manual_role_name, skills_list)
                         st.success(f"✅ Role '{manual_role_name}' added with {len(skills_list)} skills!")
                     except Exception as e:
                         st.error(f"Error: {str(e)}")
@@ -147,7 +233,7 @@ elif page == "➕ Add Role":
 elif page == "📊 Screen Resumes":
     st.header("Screen Resumes Against Job Roles")
     
-    roles_df = st.session_state.screener.db.list_roles()
+    roles_df = screener.db.list_roles()
     
     if roles_df.empty:
         st.warning("⚠️ No roles available. Please add a role first.")
@@ -156,7 +242,7 @@ elif page == "📊 Screen Resumes":
         selected_role = st.selectbox("Select Job Role", options=list(role_options.keys()))
         role_id = role_options[selected_role]
         
-        role = st.session_state.screener.db.get_role(role_id)
+        role = screener.db.get_role(role_id)
         with st.expander("📋 Role Details"):
             st.write(f"**Role Name:** {role['name']}")
             st.write(f"**Required Skills ({len(role['skills'])}):** {', '.join(role['skills'])}")
@@ -176,73 +262,41 @@ elif page == "📊 Screen Resumes":
         
         if st.button("🔍 Start Screening", type="primary", disabled=not uploaded_files):
             if uploaded_files:
-                with st.spinner(f"Screening {len(uploaded_files)} resume(s)..."):
-                    try:
-                        temp_paths = []
-                        for uploaded_file in uploaded_files:
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                                tmp_file.write(uploaded_file.getvalue())
-                                temp_paths.append(tmp_file.name)
-                        
-                        results = st.session_state.screener.screen_resumes(
-                            role_id=role_id,
-                            pdf_paths=temp_paths,
-                            semantic_threshold=semantic_threshold,
-                            skip_missing=skip_missing
-                        )
-                        
-                        for path in temp_paths:
-                            try:
-                                os.unlink(path)
-                            except:
-                                pass
-                        
-                        st.success(f"✅ Successfully screened {len(results)} resume(s)!")
-                        
-                        if results:
-                            results_df = pd.DataFrame(results)
-                            results_df = results_df.sort_values(
-                                by=['num_matched_skills', 'similarity_score'],
-                                ascending=False
-                            )
-                            
-                            st.subheader("📊 Screening Results")
-                            st.markdown("### 🏆 Top Candidates")
-                            top_3 = results_df.head(3)
-                            
-                            cols = st.columns(min(3, len(top_3)))
-                            for idx, (i, row) in enumerate(top_3.iterrows()):
-                                with cols[idx]:
-                                    st.metric(f"Rank {idx + 1}", 
-                                             f"{row['num_matched_skills']} skills",
-                                             f"{row['similarity_score']:.2%} match")
-                                    st.caption(f"Resume ID: {row['resume_id']}")
-                            
-                            st.markdown("---")
-                            st.markdown("### 📋 Detailed Results")
-                            display_cols = ['resume_id', 'num_matched_skills', 'similarity_score', 
-                                          'matched_skills', 'extraction_method']
-                            st.dataframe(results_df[display_cols], use_container_width=True, hide_index=True)
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                fig = px.bar(results_df, x='resume_id', y='num_matched_skills',
-                                           title='Skills Matched per Resume')
-                                st.plotly_chart(fig, use_container_width=True)
-                            
-                            with col2:
-                                fig = px.scatter(results_df, x='num_matched_skills', y='similarity_score',
-                                               size='num_matched_skills', title='Skills vs Similarity Score')
-                                st.plotly_chart(fig, use_container_width=True)
-                    
-                    except Exception as e:
-                        st.error(f"Error during screening: {str(e)}")
+                try:
+                    # Uploads are screened straight from memory, no temp files; the job
+                    # runs in the background so this session stays responsive
+                    job_id = job_runner.submit_screening(
+                        role_id,
+                        [uploaded_file.getvalue() for uploaded_file in uploaded_files],
+                        pdf_names=[uploaded_file.name for uploaded_file in uploaded_files],
+                        semantic_threshold=semantic_threshold,
+                        skip_missing=skip_missing
+                    )
+                    st.session_state.job_ids.append(job_id)
+                except Exception as e:
+                    st.error(f"Error during screening: {str(e)}")
+        
+        # Every extracted resume's text is stored, so earlier uploads can be
+        # screened for this role again without re-uploading or re-extracting
+        stored_count = len(screener.db.resume_ids_with_text())
+        if st.button(f"♻️ Re-screen {stored_count} stored resume(s)", disabled=not stored_count,
+                     help="Screen every resume already in the database for this role, from its stored "
+                          "text; earlier results for the same resume and role are replaced"):
+            try:
+                job_id = job_runner.submit_rescreen(role_id, semantic_threshold=semantic_threshold)
+                st.session_state.job_ids.append(job_id)
+            except Exception as e:
+                st.error(f"Error during screening: {str(e)}")
+        
+        if st.session_state.job_ids:
+            st.markdown("---")
+            show_job(st.session_state.job_ids[-1])
 
 # View Results Page
 elif page == "📈 View Results":
     st.header("View Screening Results")
     
-    roles_df = st.session_state.screener.db.list_roles()
+    roles_df = screener.db.list_roles()
     
     if roles_df.empty:
         st.warning("No roles available.")
@@ -255,7 +309,7 @@ elif page == "📈 View Results":
         
         if st.button("📊 Load Results"):
             with st.spinner("Loading results..."):
-                results_df = st.session_state.screener.db.get_results_for_role(role_id, top_n=top_n)
+                results_df = screener.db.get_results_for_role(role_id, top_n=top_n)
                 
                 if results_df.empty:
                     st.info("No screening results found for this role.")
@@ -281,11 +335,11 @@ elif page == "📈 View Results":
 elif page == "⚙️ Settings":
     st.header("System Settings")
     
-    tab1, tab2 = st.tabs(["🗑️ Manage Roles", "ℹ️ About"])
+    tab1, tab_profile, tab2 = st.tabs(["🗑️ Manage Roles", "🔬 Profiling", "ℹ️ About"])
     
     with tab1:
         st.subheader("Delete Roles")
-        roles_df = st.session_state.screener.db.list_roles()
+        roles_df = screener.db.list_roles()
         
         if not roles_df.empty:
             role_to_delete = st.selectbox("Select role to delete",
@@ -293,12 +347,60 @@ elif page == "⚙️ Settings":
             
             if st.button("🗑️ Delete Role", type="secondary"):
                 role_id = int(role_to_delete.split("ID: ")[1].rstrip(")"))
-                st.session_state.screener.db.delete_role(role_id)
+                screener.db.delete_role(role_id)
                 st.success("Role deleted successfully!")
                 st.rerun()
         else:
             st.info("No roles to delete.")
     
+    with tab_profile:
+        st.subheader("Profile a Screening Run")
+        st.caption("Wraps the next screening run in cProfile and tracemalloc. It runs noticeably "
+                   "slower while profiled; normal runs are unaffected.")
+        # A button rather than a toggle: the request is used up by one run, a toggle would re-arm it
+        if screener.profile_pending:
+            st.info("⏳ The next screening run will be profiled.")
+            if st.button("Cancel profiling"):
+                screener.cancel_profile()
+                st.rerun()
+        elif st.button("🔬 Profile the next screening run"):
+            screener.profile_next_run()
+            st.rerun()
+        
+        profiles = list_profiles()
+        if profiles:
+            selected_profile = st.selectbox("Saved profiles", options=profiles,
+                                            format_func=lambda path: Path(path).stem)
+            report = load_profile(selected_profile)
+            st.write(f"**Run:** {report['run'].get('kind', '')} for role(s) {report['run'].get('role_ids')}, "
+                     f"{len(report['resumes'])} resume(s), {report['seconds']:.1f}s")
+            st.dataframe(pd.DataFrame([{"stage": name, "seconds": stage["seconds"],
+                                        "peak traced MB": stage["peak_traced_mb"]}
+                                       for name, stage in report["stages"].items()]),
+                         use_container_width=True, hide_index=True)
+            stage_name = st.selectbox("Stage", options=list(report["stages"]))
+            if stage_name:
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write("**Hot functions**")
+                    st.dataframe(pd.DataFrame(report["stages"][stage_name]["hot_functions"]),
+                                 use_container_width=True, hide_index=True)
+                with col2:
+                    st.write("**Allocation sites**")
+                    st.dataframe(pd.DataFrame(report["stages"][stage_name]["allocations"]),
+                                 use_container_width=True, hide_index=True)
+            if report["resumes"]:
+                st.write(f"**Per-resume extraction** (median {report['median_extract_seconds']:.2f}s; "
+                         f"{len(report['outliers'])} outlier(s))")
+                st.dataframe(pd.DataFrame(report["resumes"]).sort_values("extract_seconds", ascending=False),
+                             use_container_width=True, hide_index=True)
+            else:
+                st.caption("No resumes were screened in this run.")
+            st.download_button("📥 Download profile (JSON)", data=json.dumps(report, indent=2),
+                               file_name=Path(selected_profile).name, mime="application/json")
+        else:
+            st.info("No profiles saved yet.")
+    
     with tab2:
         st.subheader("About This System")
         st.markdown("""
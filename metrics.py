@@ -0,0 +1,282 @@
+"""
+Process-wide metrics (counters, histograms, stage timers), Prometheus export and logging setup
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from config import LOG_LEVEL, LOG_FORMAT, METRICS_TEXTFILE_PATH, METRICS_PORT
+
+# Modules declare their metrics at import time (see pdf_extractor, skill_extractor,
+# semantic_matcher, database, screening_engine); everything is kept in memory and
+# rendered on demand, so recording a value costs a dict update under a lock.
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {sorted(labelnames)}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, key)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value)
+                    for key, value in sorted(self._values.items())]
+
+    def snapshot(self):
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Bucketed distribution (count, sum and cumulative buckets) per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                    out.append((f"{self.name}_bucket", labels, cumulative))
+                labels = _format_labels(self.labelnames, key)
+                out.append((f"{self.name}_sum", labels, state["sum"]))
+                out.append((f"{self.name}_count", labels, state["count"]))
+        return out
+
+    def snapshot(self):
+        with self._lock:
+            return {",".join(key): {"count": state["count"], "sum": state["sum"]}
+                    for key, state in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _register(cls, name, help_text, labelnames, **kwargs):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help_text, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+
+def counter(name, help_text, labelnames=()):
+    """The process-wide counter called name, created on first use"""
+    return _register(Counter, name, help_text, labelnames)
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    """The process-wide histogram called name, created on first use"""
+    return _register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    with _metrics_lock:
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """{metric name: {label values joined by ',': value or {count, sum}}} for every recorded metric"""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return {metric.name: values for metric in metrics if (values := metric.snapshot())}
+
+
+def reset_metrics():
+    """Zero every metric (registrations are kept)"""
+    with _metrics_lock:
+        for metric in _metrics.values():
+            metric.reset()
+
+
+def write_textfile(path=METRICS_TEXTFILE_PATH):
+    """Atomically replace path with the current metrics, so a scraper never reads half a file"""
+    if not path:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".prom")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=METRICS_PORT, addr="127.0.0.1"):
+    """Serve /metrics on addr:port from a daemon thread; later calls return the running server"""
+    global _server
+    if port is None:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes every few seconds would drown the application log
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((addr, int(port)), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            logging.getLogger(__name__).info("Serving metrics on http://%s:%d/metrics", addr, _server.server_port)
+        return _server
+
+
+# Attributes every LogRecord has; anything else was passed through extra= and is structured data
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class _TextFormatter(logging.Formatter):
+    """'[INFO] message', as the pipeline has always printed, with WARNING shortened to WARN"""
+
+    def format(self, record):
+        level = "WARN" if record.levelno == logging.WARNING else record.levelname
+        text = f"[{level}] {record.getMessage()}"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class _JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and every extra= field"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, force=False):
+    """
+    Send log records to stderr as text or JSON lines. Leaves an existing root
+    handler alone unless force is set, so an embedding application keeps its own.
+    """
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(_JsonFormatter() if fmt == "json" else _TextFormatter())
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,50 @@
+"""
+Process-wide registry of loaded NLP models
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def get_model(kind, name, loader):
+    """
+    Return the shared instance of (kind, name), calling loader(name) the first
+    time. Concurrent callers for the same model wait for a single load instead
+    of each loading their own copy; different models load in parallel.
+    """
+    key = (kind, name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _models:
+            logger.info("Loading %s model '%s'...", kind, name)
+            started = time.perf_counter()
+            _models[key] = loader(name)
+            elapsed = time.perf_counter() - started
+            logger.info("Loaded %s model '%s' in %.2fs", kind, name, elapsed,
+                        extra={"model_kind": kind, "model": name, "seconds": round(elapsed, 3)})
+        return _models[key]
+
+
+def loaded_models():
+    """(kind, name) of every model currently held by the registry"""
+    return list(_models)
+
+
+def clear_models():
+    """Drop every shared model (they are reloaded on next use)"""
+    with _registry_lock:
+        _models.clear()
@@ -1,43 +1,336 @@
-import fitz  # PyMuPDF
-import pdfplumber
-import pytesseract
-from PIL import Image
 import io
+import os
+import hashlib
+import signal
+import threading
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, OCR_DPI, OCR_MAX_PAGES,
+                    OCR_WORKERS, OCR_MIN_PAGE_CHARS, OCR_PAGE_TIMEOUT)
+from metrics import counter, histogram, SIZE_BUCKETS
+
+# Every extractor accepts a file path, raw PDF bytes or a binary file-like object
+# (e.g. a Streamlit upload), so uploads never need a round trip through disk.
+#
+# PyMuPDF, pdfplumber, pytesseract and PIL are imported inside the functions
+# that use them, so importing this module (e.g. for hashing) stays cheap.
+
+EXTRACTED_FILES = counter("resume_extraction_files_total",
+                          "PDFs extracted, by the path that produced the text", ("method",))
+EXTRACTION_SECONDS = histogram("resume_extraction_seconds", "Per-file extraction time", ("method",))
+OCR_PAGES = counter("resume_ocr_pages_total", "Pages rasterized and run through OCR")
+OCR_PAGE_ERRORS = counter("resume_ocr_page_errors_total", "Pages whose OCR failed (their text layer is kept)")
+OCR_PAGES_PER_FILE = histogram("resume_ocr_pages_per_file", "OCR'd pages per file that needed OCR",
+                               buckets=SIZE_BUCKETS)
+
+def load_pdf_source(source):
+    """Normalize a PDF source to a path string or bytes; None if it is missing or empty"""
+    if source is None:
+        return None
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source) or None
+    if hasattr(source, 'getvalue'):
+        return source.getvalue() or None
+    if hasattr(source, 'read'):
+        return source.read() or None
+    path = str(source)
+    return path if path and os.path.exists(path) else None
+
+
+def pdf_source_name(source, index=0):
+    """Label to store for a source: its path, its file name, or a positional placeholder"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    return getattr(source, 'name', None) or f'upload_{index + 1}.pdf'
+
+
+def _open_fitz(source):
+    import fitz  # PyMuPDF
+    if isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, 'read'):
+        return fitz.open(stream=load_pdf_source(source), filetype='pdf')
+    return fitz.open(source)
+
+
+def _open_pdfplumber(source):
+    import pdfplumber
+    if isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, 'read'):
+        return pdfplumber.open(io.BytesIO(load_pdf_source(source)))
+    return pdfplumber.open(source)
+
+
+def compute_pdf_hash(source):
+    """SHA-256 of the raw PDF bytes, used to recognise re-uploads"""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, 'read'):
+        digest.update(load_pdf_source(source) or b'')
+        return digest.hexdigest()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 def extract_text_with_pymupdf(pdf_path):
     text = ''
-    with fitz.open(pdf_path) as doc:
+    with _open_fitz(pdf_path) as doc:
         for page in doc:
             text += page.get_text()
     return text
 
 def extract_text_with_pdfplumber(pdf_path):
     text = ''
-    with pdfplumber.open(pdf_path) as pdf:
+    with _open_pdfplumber(pdf_path) as pdf:
         for page in pdf.pages:
             text += page.extract_text() or ''
     return text
 
 def extract_text_with_ocr(pdf_path):
+    return _ocr_document(pdf_path)[0]
+
+
+def _ocr_document(pdf_path):
+    import pytesseract
     text = ''
-    with pdfplumber.open(pdf_path) as pdf:
+    with _open_pdfplumber(pdf_path) as pdf:
         for page in pdf.pages:
             img = page.to_image().original
-            text += pytesseract.image_to_string(img)  # OCR extraction
-    return text
+            text += pytesseract.image_to_string(img, timeout=OCR_PAGE_TIMEOUT)  # OCR extraction
+        return text, len(pdf.pages)
+
+
+def _ocr_image(img):
+    import pytesseract
+    # tesseract is killed (RuntimeError) if a single page takes longer than this
+    return pytesseract.image_to_string(img, timeout=OCR_PAGE_TIMEOUT)
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+def _text_layer(doc):
+    """
+    Each page's text layer, plus the pages that need OCR: pages with fewer than
+    OCR_MIN_PAGE_CHARS characters that carry an image (a scanned page), or every
+    such page when the document has no text layer at all. Blank pages and short
+    footers in native documents are left alone.
+    """
+    page_texts = [page.get_text() for page in doc]
+    has_text_layer = any(len(t.strip()) >= OCR_MIN_PAGE_CHARS for t in page_texts)
+    candidates = [page.number for page in doc
+                  if len(page_texts[page.number].strip()) < OCR_MIN_PAGE_CHARS
+                  and (not has_text_layer or page.get_images())]
+    return page_texts, candidates
+
+
+def _ocr_pages(doc, page_texts, page_numbers, dpi=OCR_DPI, ocr_workers=OCR_WORKERS):
+    """
+    OCR the given pages in parallel, replacing their text where OCR finds more.
+    A page whose OCR fails keeps its text layer; returns (pages OCR'd, errors).
+    """
+    from PIL import Image
+    if not page_numbers:
+        return 0, []
+    images = {}
+    for page_no in page_numbers:
+        # Rasterize while the document is open; fitz is not thread-safe
+        pix = doc[page_no].get_pixmap(dpi=dpi)
+        images[page_no] = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    ocr_done = 0
+    errors = []
+    # tesseract runs as a subprocess, so threads give real parallelism here
+    pool = ThreadPoolExecutor(max_workers=max(1, min(ocr_workers, len(images))))
+    try:
+        futures = {page_no: pool.submit(_ocr_image, img) for page_no, img in images.items()}
+        for page_no, future in futures.items():
+            try:
+                ocr_text = future.result()
+            except ExtractionTimeout:
+                raise
+            except Exception as e:
+                errors.append(e)
+                continue
+            ocr_done += 1
+            # Keep whatever text layer the page had if OCR finds nothing better
+            if len(ocr_text.strip()) > len(page_texts[page_no].strip()):
+                page_texts[page_no] = ocr_text
+    finally:
+        # On a timeout, don't wait for the pages still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+    return ocr_done, errors
+
+
+def _extract_pages(doc, dpi=OCR_DPI, max_ocr_pages=OCR_MAX_PAGES, ocr_workers=OCR_WORKERS):
+    page_texts, candidates = _text_layer(doc)
+    ocr_done, errors = _ocr_pages(doc, page_texts, candidates[:max_ocr_pages], dpi, ocr_workers)
+    return ''.join(page_texts), ocr_done, errors
+
+
+def extract_text_with_page_ocr(pdf_path, dpi=OCR_DPI, max_ocr_pages=OCR_MAX_PAGES, ocr_workers=OCR_WORKERS):
+    """
+    Single-open extraction: take the text layer from every page and OCR only
+    the pages that lack one, in parallel, up to max_ocr_pages per document.
+    Returns (text, number of OCR'd pages); raises the OCR error only if no
+    text was found at all.
+    """
+    with _open_fitz(pdf_path) as doc:
+        text, ocr_done, errors = _extract_pages(doc, dpi, max_ocr_pages, ocr_workers)
+    if errors and not text.strip():
+        raise errors[0]
+    return text, ocr_done
 
 
 def extract_text_from_pdf(pdf_path):
-    # Attempt extraction with PyMuPDF
-    text = extract_text_with_pymupdf(pdf_path)
-    if text.strip():
-        return text
-    # If PyMuPDF extraction fails, try pdfplumber
-    text = extract_text_with_pdfplumber(pdf_path)
-    if text.strip():
-        return text
-    # If both methods fail, fallback to OCR
-    return extract_text_with_ocr(pdf_path)
+    return extract_text_with_method(pdf_path)[0]
+
+
+def _try_pdfplumber(pdf_path):
+    try:
+        return extract_text_with_pdfplumber(pdf_path)
+    except ExtractionTimeout:
+        raise
+    except Exception:
+        return ''
+
+
+def _extract(pdf_path):
+    """The extraction chain; returns (text, {method, ocr_pages, ocr_errors})"""
+    # Attempt extraction with PyMuPDF, OCR'ing only pages without a text layer
+    try:
+        doc = _open_fitz(pdf_path)
+    except ExtractionTimeout:
+        raise
+    except Exception:
+        doc = None
+    if doc is None:
+        # If PyMuPDF cannot read the file, try pdfplumber, then OCR the whole document
+        text = extract_text_with_pdfplumber(pdf_path)
+        if text.strip():
+            return text, {"method": "pdfplumber", "ocr_pages": 0, "ocr_errors": 0}
+        text, ocr_done = _ocr_document(pdf_path)
+        return text, {"method": "ocr", "ocr_pages": ocr_done, "ocr_errors": 0}
+
+    with doc:
+        page_texts, candidates = _text_layer(doc)
+        if not ''.join(page_texts).strip():
+            # No text layer according to PyMuPDF; pdfplumber sometimes reads one anyway
+            text = _try_pdfplumber(pdf_path)
+            if text.strip():
+                return text, {"method": "pdfplumber", "ocr_pages": 0, "ocr_errors": 0}
+        ocr_done, errors = _ocr_pages(doc, page_texts, candidates[:OCR_MAX_PAGES])
+    text = ''.join(page_texts)
+    if errors and not text.strip():
+        errors[0].ocr_errors = len(errors)  # counted by the caller like any other page failure
+        raise errors[0]  # nothing to keep: report the OCR failure
+    return text, {"method": "pymupdf+ocr" if ocr_done else "pymupdf", "ocr_pages": ocr_done,
+                  "ocr_errors": len(errors)}
+
+
+def extract_text_with_method(pdf_path):
+    """
+    Run the extraction chain and report which path produced the text.
+    Returns (text, method, ocr_pages); method is "pymupdf", "pymupdf+ocr"
+    (text layer plus OCR'd pages), "pdfplumber" or "ocr" (whole document).
+    Pages whose OCR fails keep their text layer.
+    """
+    text, details = _extract(pdf_path)
+    return text, details["method"], details["ocr_pages"]
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _can_alarm():
+    """SIGALRM timeouts only work on Unix and only from the main thread"""
+    return hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+
+
+def _extract_worker(args):
+    # Runs inside a pool process: any failure is returned, never raised, so one
+    # corrupt PDF cannot take the batch down with it
+    pdf_path, timeout = args
+    # Signals can only be installed from the main thread; extract_texts_parallel
+    # never runs this in-process elsewhere, this is just a guard for direct callers
+    use_alarm = bool(timeout) and _can_alarm()
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(int(timeout))
+    started = time.perf_counter()
+    # Metrics recorded in a pool process would be lost; the details go back to the parent
+    details = {"method": "failed", "ocr_pages": 0, "ocr_errors": 0}
+    try:
+        text, found = _extract(pdf_path)
+        details.update(found)
+        return text, None, details
+    except ExtractionTimeout:
+        details["method"] = "timeout"
+        return '', f'timed out after {timeout}s', details
+    except Exception as e:
+        details["ocr_errors"] = getattr(e, "ocr_errors", 0)
+        return '', f'{type(e).__name__}: {e}', details
+    finally:
+        details["seconds"] = time.perf_counter() - started
+        if use_alarm:
+            signal.alarm(0)
+
+
+def _record_extraction(details):
+    EXTRACTED_FILES.inc(method=details["method"])
+    EXTRACTION_SECONDS.observe(details.get("seconds", 0.0), method=details["method"])
+    if details["ocr_pages"]:
+        OCR_PAGES.inc(details["ocr_pages"])
+        OCR_PAGES_PER_FILE.observe(details["ocr_pages"])
+    if details.get("ocr_errors"):
+        OCR_PAGE_ERRORS.inc(details["ocr_errors"])
+
+
+def extract_texts_parallel(pdf_paths, max_workers=None, timeout=EXTRACTION_TIMEOUT, details=False):
+    """
+    Extract text from many PDFs (paths or bytes) with a process pool.
+
+    Returns a list of (text, error) tuples in input order; error is None on
+    success. Each file runs the usual PyMuPDF -> pdfplumber -> OCR chain.
+    With details=True each tuple gets a third item, {method, ocr_pages,
+    seconds}, naming the path that produced the text (see
+    extract_text_with_method; "failed" or "timeout" on error).
+    max_workers defaults to EXTRACTION_WORKERS, then to the CPU count.
+    """
+    # File-like objects cannot be sent to worker processes; hand over their bytes
+    pdf_paths = [p if isinstance(p, (str, bytes, os.PathLike)) else load_pdf_source(p) for p in pdf_paths]
+    if not pdf_paths:
+        return []
+
+    workers = min(max_workers or EXTRACTION_WORKERS or os.cpu_count() or 1, len(pdf_paths))
+    # In-process extraction relies on SIGALRM for its timeout; off the main thread
+    # (Streamlit scripts, background jobs) even one file goes to a pool process,
+    # which keeps both the timeout and the crash isolation
+    if workers <= 1 and (not timeout or _can_alarm()):
+        results = [_extract_worker((path, timeout)) for path in pdf_paths]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            pending = [pool.apply_async(_extract_worker, ((path, timeout),)) for path in pdf_paths]
+            results = []
+            for path, res in zip(pdf_paths, pending):
+                try:
+                    # The worker enforces the timeout itself; this is the backstop for
+                    # a worker stuck in native code that never returns to Python
+                    results.append(res.get(timeout + 5 if timeout else None))
+                except multiprocessing.TimeoutError:
+                    results.append(('', f'timed out after {timeout}s',
+                                    {"method": "timeout", "ocr_pages": 0, "seconds": timeout + 5}))
+                except Exception as e:
+                    results.append(('', f'{type(e).__name__}: {e}', {"method": "failed", "ocr_pages": 0}))
+        finally:
+            # terminate() also kills any worker still stuck on a timed-out file
+            pool.terminate()
+            pool.join()
+
+    for _, _, info in results:
+        _record_extraction(info)
+    return results if details else [(text, error) for text, error, _ in results]
 
 if __name__ == '__main__':
     pdf_path = 'path_to_your_pdf.pdf'  # Specify your PDF path here
@@ -0,0 +1,205 @@
+"""
+Opt-in profiling of one screening run: cProfile and tracemalloc per stage, per-resume timings
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config import PROFILE_DIR, PROFILE_TOP_N
+
+logger = logging.getLogger(__name__)
+
+# Extraction slower than this many times the run's median (and at least
+# OUTLIER_MIN_SECONDS) marks a PDF as an outlier
+OUTLIER_FACTOR = 3.0
+OUTLIER_MIN_SECONDS = 0.5
+
+
+def _short_path(filename):
+    """Paths inside the working directory relative to it, everything else as is"""
+    if filename.startswith("<"):
+        return filename
+    path = os.path.abspath(filename)
+    cwd = os.getcwd()
+    return os.path.relpath(path, cwd) if path.startswith(cwd + os.sep) else path
+
+
+def _function_label(key):
+    filename, line, name = key
+    if filename == "~":
+        return name  # built-in, e.g. <method 'encode' of ...>
+    return f"{_short_path(filename)}:{line}({name})"
+
+
+def _hot_functions(profile, top_n):
+    """Top functions by own (exclusive) time, with their cumulative time"""
+    try:
+        stats = pstats.Stats(profile).stats
+    except TypeError:
+        return []  # the profile never ran (another profiler was active)
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+    return [{
+        "function": _function_label(key),
+        "calls": nc,
+        "own_seconds": round(tt, 6),
+        "cumulative_seconds": round(ct, 6),
+    } for key, (cc, nc, tt, ct, callers) in rows]
+
+
+def _allocation_sites(before, after, top_n):
+    """Lines that allocated the most memory still alive at the end of the stage"""
+    diffs = after.compare_to(before, "lineno")
+    # Leave out the snapshots' own bookkeeping
+    diffs = [d for d in diffs if d.size_diff > 0 and d.traceback[0].filename != tracemalloc.__file__][:top_n]
+    return [{
+        "site": f"{_short_path(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+        "size_kb": round(d.size_diff / 1024, 1),
+        "blocks": d.count_diff,
+    } for d in diffs]
+
+
+class RunProfiler:
+    """
+    Profiles the stages of one screening run. Each stage gets its own cProfile
+    profile (re-entered stages accumulate) and a tracemalloc snapshot diff;
+    per-resume extraction timings are collected as batches are ingested.
+    save() writes a JSON summary plus one .prof file per stage (open with
+    pstats or snakeviz) and returns the JSON path.
+
+    Only the thread running the stages is profiled: PDF extraction happens in
+    worker processes, so it shows up through the per-resume timings instead.
+    """
+
+    def __init__(self, out_dir=PROFILE_DIR, top_n=PROFILE_TOP_N):
+        self.out_dir = out_dir
+        self.top_n = top_n
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._profiles = {}
+        self._stages = {}
+        self.resumes = []
+        # Leave tracemalloc as we found it (someone else may be tracing)
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        info = self._stages.setdefault(name, {"seconds": 0.0, "calls": 0, "peak_traced_mb": 0.0, "allocations": {}})
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        try:
+            profile.enable()
+            profiling = True
+        except ValueError:
+            # Another profiler is already active (e.g. the whole app runs under cProfile)
+            profiling = False
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            info["seconds"] += time.perf_counter() - started
+            if profiling:
+                profile.disable()
+            info["calls"] += 1
+            info["peak_traced_mb"] = max(info["peak_traced_mb"], tracemalloc.get_traced_memory()[1] / 2 ** 20)
+            for site in _allocation_sites(before, tracemalloc.take_snapshot(), self.top_n):
+                seen = info["allocations"].setdefault(site["site"], {"size_kb": 0.0, "blocks": 0})
+                seen["size_kb"] += site["size_kb"]
+                seen["blocks"] += site["blocks"]
+
+    def record_resumes(self, names, details, texts):
+        """Per-resume extraction details for one ingested batch (aligned lists)"""
+        for name, info, text in zip(names, details, texts):
+            self.resumes.append({
+                "name": name,
+                "method": info.get("method"),
+                "reused": info.get("reused", False),
+                "extract_seconds": round(info.get("seconds", 0.0), 4),
+                "ocr_pages": info.get("ocr_pages", 0),
+                "chars": len(text or ""),
+            })
+
+    def _flag_outliers(self):
+        timed = [r["extract_seconds"] for r in self.resumes if not r["reused"]]
+        median = statistics.median(timed) if timed else 0.0
+        limit = max(OUTLIER_FACTOR * median, OUTLIER_MIN_SECONDS)
+        outliers = []
+        for r in self.resumes:
+            slow = not r["reused"] and r["extract_seconds"] >= limit
+            r["outlier"] = slow or not r["chars"]
+            if not r["outlier"]:
+                continue
+            r["reasons"] = []
+            if slow:
+                ratio = f" ({r['extract_seconds'] / median:.1f}x median)" if median else ""
+                r["reasons"].append(f"extraction {r['extract_seconds']:.2f}s{ratio}")
+            if r["ocr_pages"]:
+                r["reasons"].append(f"{r['ocr_pages']} OCR'd page(s)")
+            if not r["chars"]:
+                r["reasons"].append("no text extracted")
+            outliers.append(r)
+        return median, sorted(outliers, key=lambda r: r["extract_seconds"], reverse=True)
+
+    def save(self, run_info=None):
+        """Stop tracing and write the artifacts; returns the path of the JSON summary"""
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        os.makedirs(self.out_dir, exist_ok=True)
+        stem = os.path.join(self.out_dir, f"profile-{self.started_at:%Y%m%d-%H%M%S-%f}-{os.getpid()}")
+
+        stages = {}
+        for name, info in self._stages.items():
+            prof_path = f"{stem}-{name}.prof"
+            self._profiles[name].dump_stats(prof_path)
+            allocations = sorted(({"site": site, **seen} for site, seen in info["allocations"].items()),
+                                 key=lambda a: a["size_kb"], reverse=True)[:self.top_n]
+            stages[name] = {
+                "seconds": round(info["seconds"], 4),
+                "calls": info["calls"],
+                "peak_traced_mb": round(info["peak_traced_mb"], 2),
+                "hot_functions": _hot_functions(self._profiles[name], self.top_n),
+                "allocations": allocations,
+                "pstats_file": prof_path,
+            }
+
+        median, outliers = self._flag_outliers()
+        report = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self._started, 4),
+            "run": run_info or {},
+            "stages": stages,
+            "median_extract_seconds": round(median, 4),
+            "outliers": [r["name"] for r in outliers],
+            "resumes": self.resumes,
+        }
+        path = f"{stem}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Profile saved to %s (%d stage(s), %d outlier PDF(s))", path, len(stages), len(outliers),
+                    extra={"profile": path})
+        return path
+
+
+def list_profiles(out_dir=PROFILE_DIR):
+    """Saved profile summaries, newest first"""
+    if not os.path.isdir(out_dir):
+        return []
+    paths = [os.path.join(out_dir, name) for name in os.listdir(out_dir)
+             if name.startswith("profile-") and name.endswith(".json")]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def load_profile(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,136 @@
+"""
+Persistent vector index over screened resume embeddings
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import threading
+import numpy as np
+
+
+def quantize(vector):
+    """int8 codes plus one float scale per vector (4x smaller than float32 on disk)"""
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.abs(vector).max()) / 127.0 if vector.size else 0.0
+    if scale == 0.0:
+        return np.zeros(vector.shape, dtype=np.int8), 0.0
+    return np.clip(np.rint(vector / scale), -127, 127).astype(np.int8), scale
+
+
+def dequantize(codes, scale):
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+class ResumeVectorIndex:
+    """
+    Brute-force NumPy index of one embedding per resume, stored int8-quantized in
+    the screening database. The whole pool is held in memory as one float32
+    matrix, so a query is a single matrix-vector product; rows written since the
+    last query (by this or another process) are picked up incrementally by their
+    write sequence number.
+    """
+
+    def __init__(self, db, model_name):
+        self.db = db
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._ids = []
+        self._positions = {}
+        self._matrix = None
+        self._last_seq = 0
+        self.init_db()
+
+    def init_db(self):
+        """Create the vector table if it doesn't exist"""
+        with self.db.transaction("resume_index.init_db") as cur:
+            # seq grows with every write (AUTOINCREMENT never reuses a value), so
+            # syncing on it sees vectors for older resume ids and replaced vectors too
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS resume_vectors (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    resume_id INTEGER UNIQUE,
+                    model_name TEXT,
+                    dim INTEGER,
+                    scale REAL,
+                    vector BLOB,
+                    FOREIGN KEY(resume_id) REFERENCES resumes(id)
+                )
+            """)
+
+    def add(self, resume_ids, vectors):
+        """Store (or replace) the embedding of each resume; repeated ids keep the last vector"""
+        # REPLACE deletes the old row and inserts a new one with a fresh seq
+        rows = {}
+        for rid, vector in zip(resume_ids, vectors):
+            if rid is None:
+                continue
+            codes, scale = quantize(vector)
+            rows[int(rid)] = (int(rid), self.model_name, int(codes.shape[0]), scale, codes.tobytes())
+        if not rows:
+            return
+        with self.db.transaction("resume_index.add") as cur:
+            cur.executemany(
+                "INSERT OR REPLACE INTO resume_vectors (resume_id, model_name, dim, scale, vector) VALUES (?, ?, ?, ?, ?)",
+                list(rows.values())
+            )
+
+    def missing_ids(self, resume_ids):
+        """Subset of resume_ids without a vector for the current model"""
+        self._sync()
+        return [rid for rid in resume_ids if rid not in self._positions]
+
+    def vectors(self, resume_ids):
+        """(ids found, their vectors as one matrix) for the indexed subset of resume_ids"""
+        self._sync()
+        found = [rid for rid in dict.fromkeys(resume_ids) if rid in self._positions]
+        if not found:
+            return [], None
+        return found, self._matrix[[self._positions[rid] for rid in found]]
+
+    def _sync(self):
+        """Load rows written since the last sync; replaced rows get a new seq and are reloaded"""
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, resume_id, dim, scale, vector FROM resume_vectors WHERE seq > ? AND model_name = ? ORDER BY seq",
+                (self._last_seq, self.model_name)
+            ).fetchall()
+        if not rows:
+            return
+
+        with self._lock:
+            appended = []
+            for seq, rid, dim, scale, blob in rows:
+                self._last_seq = max(self._last_seq, seq)
+                vector = dequantize(np.frombuffer(blob, dtype=np.int8, count=dim), scale)
+                if rid in self._positions:
+                    self._matrix[self._positions[rid]] = vector
+                else:
+                    self._positions[rid] = len(self._ids) + len(appended)
+                    appended.append((rid, vector))
+            if appended:
+                block = np.stack([v for _, v in appended])
+                self._matrix = block if self._matrix is None else np.vstack([self._matrix, block])
+                self._ids.extend(rid for rid, _ in appended)
+
+    def __len__(self):
+        self._sync()
+        return len(self._ids)
+
+    def search(self, query_vector, top_k=10, min_score=None):
+        """
+        Best resumes for an L2-normalized query vector.
+        Returns [(resume_id, cosine_similarity)] sorted best first.
+        """
+        self._sync()
+        if self._matrix is None or not top_k:
+            return []
+
+        scores = self._matrix @ np.asarray(query_vector, dtype=np.float32)
+        candidates = np.arange(scores.shape[0])
+        if min_score is not None:
+            candidates = candidates[scores >= min_score]
+        if candidates.size > top_k:
+            # Partial selection, then sort only the top_k survivors
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in candidates]
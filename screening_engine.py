@@ -4,109 +4,592 @@ Author: Gladiator2005
 Date: 2025-11-09
 """
 
-from pathlib import Path
-from pdf_extractor import extract_text_from_pdf
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+import numpy as np
+from pdf_extractor import extract_texts_parallel, compute_pdf_hash, load_pdf_source, pdf_source_name
 from skill_extractor import SkillExtractor
 from semantic_matcher import SemanticMatcher
 from database import ResumeDatabase
-from config import SKILLS_DB
+from resume_index import ResumeVectorIndex
+from metrics import counter, histogram, configure_logging, write_textfile
+from config import SKILLS_DB, DEFAULT_SEMANTIC_THRESHOLD, STREAM_BATCH_SIZE, DB_PATH, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = histogram("resume_stage_seconds", "Time per pipeline stage per screening batch", ("stage",))
+SCREENED_RESUMES = counter("resume_screened_total", "Resumes scored (once per role)")
+SKIPPED_RESUMES = counter("resume_skipped_total", "Resumes not screened, by reason", ("reason",))
+
+
+@contextmanager
+def _stage(timings, name, profiler=None):
+    """Add the seconds spent in the block to timings[name] and the stage histogram (and profile it, if profiling)"""
+    # The profiler's own snapshots happen outside the timed block
+    with profiler.stage(name) if profiler is not None else nullcontext():
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timings[name] = timings.get(name, 0.0) + elapsed
+            STAGE_SECONDS.observe(elapsed, stage=name)
 
 
 class ResumeScreener:
     """Main resume screening engine"""
     
-    def __init__(self):
+    def __init__(self, db_path=DB_PATH, encoder_backend=None, embedding_cache=None):
         """Initialize components"""
-        self.db = ResumeDatabase()
+        configure_logging()
+        self.db = ResumeDatabase(db_path)
         self.skill_extractor = SkillExtractor(SKILLS_DB)
-        self.semantic_matcher = SemanticMatcher()
+        self.semantic_matcher = SemanticMatcher(cache=embedding_cache, backend=encoder_backend)
+        self.resume_index = ResumeVectorIndex(self.db, self.semantic_matcher.model_tag)
+        self._profile_dir = None
+        self._profile_lock = threading.Lock()
+        self.last_profile_path = None
+    
+    def warm_up(self):
+        """
+        Load every model and run one tiny batch through each stage, so the first
+        real request doesn't pay for it. Safe to call from a background thread.
+        Returns the seconds spent per stage.
+        """
+        timings = {}
+        started = time.perf_counter()
+        self.skill_extractor.extract_skills_batch(["Warm-up resume: Python, SQL and Docker."])
+        timings["skill_extractor"] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        self.semantic_matcher.encode(["warm-up"])
+        self.semantic_matcher.encode_skills(SKILLS_DB)
+        timings["semantic_matcher"] = time.perf_counter() - started
+        
+        logger.info("Warm-up done: %s", ", ".join(f"{stage} {secs:.2f}s" for stage, secs in timings.items()),
+                    extra={"timings": timings})
+        return timings
+    
+    def profile_next_run(self, out_dir=PROFILE_DIR):
+        """
+        Profile the next screening run (screen_resumes, iter_screen_resumes or
+        screen_resumes_multi_role) with cProfile and tracemalloc per stage. The
+        artifact's path is left in last_profile_path; see profiling.RunProfiler.
+        """
+        self._profile_dir = out_dir
+    
+    @property
+    def profile_pending(self):
+        """True while a profile_next_run request is waiting for its run"""
+        return self._profile_dir is not None
+    
+    def cancel_profile(self):
+        self._profile_dir = None
+    
+    def _claim_profiler(self):
+        """A profiler if a run was requested (only one run claims it), else None"""
+        if self._profile_dir is None:
+            return None
+        with self._profile_lock:
+            out_dir, self._profile_dir = self._profile_dir, None
+        if out_dir is None:
+            return None
+        # Imported here: profiling is opt-in and costs nothing when off
+        from profiling import RunProfiler
+        return RunProfiler(out_dir)
+    
+    def _finish_profiler(self, profiler, **run_info):
+        self.last_profile_path = profiler.save(run_info)
+        return self.last_profile_path
     
     def add_role_from_text(self, name, job_text):
         """Add role by extracting skills from job description"""
         skills = self.skill_extractor.extract_skills(job_text)
         skills_text = "; ".join(skills)
-        self.db.add_role(name, skills_text)
-        print(f"[INFO] Role '{name}' saved with skills: {skills_text}")
+        self._save_role(name, skills_text)
         return skills
     
     def add_role_manual(self, name, skills_list):
         """Add role with manually specified skills"""
         skills_text = "; ".join([s.strip().lower() for s in skills_list if s.strip()])
-        self.db.add_role(name, skills_text)
-        print(f"[INFO] Role '{name}' saved with skills: {skills_text}")
+        self._save_role(name, skills_text)
         return skills_text.split("; ")
     
-    def screen_resumes(self, role_id, pdf_paths, semantic_threshold=0.45, skip_missing=True, use_fallback=False, fallbacks=None):
-        """Screen multiple resumes for a role"""
+    def _save_role(self, name, skills_text):
+        """Upsert a role, store its embeddings, and re-score its existing results if the skills changed"""
+        previous = self.db.get_role_by_name(name)
+        role_id = self.db.add_role(name, skills_text)
+        self._store_role_embeddings(role_id, name, skills_text)
+        logger.info("Role '%s' saved with skills: %s", name, skills_text, extra={"role_id": role_id})
+        if previous and previous["skills_text"] != skills_text:
+            self.rescore_role(role_id, previous["skills"])
+        return role_id
+    
+    def screen_resumes(self, role_id, pdf_paths, semantic_threshold=0.45, skip_missing=True, use_fallback=False, fallbacks=None, extraction_workers=None, pdf_names=None, progress=None, job_id=None):
+        """
+        Screen multiple resumes for a role.
+        pdf_paths may mix file paths, raw PDF bytes and binary file-like objects;
+        pdf_names optionally labels each entry (defaults to the path or file name).
+        progress(stage, count) is called as each stage finishes the batch, and
+        job_id tags the stored results with the background job that made them.
+        """
+        role = self.db.get_role(role_id)
+        if not role:
+            raise ValueError(f"Role id {role_id} not found")
+        
+        profiler = self._claim_profiler()
+        try:
+            results = self._screen([role], pdf_paths, semantic_threshold, skip_missing, use_fallback,
+                                   fallbacks, extraction_workers, pdf_names, progress=progress, job_id=job_id,
+                                   profiler=profiler)
+        finally:
+            if profiler is not None:
+                self._finish_profiler(profiler, kind="screen_resumes", role_ids=[role_id], job_id=job_id)
+        return results.get(role_id, [])
+    
+    def iter_screen_resumes(self, role_id, pdf_paths, semantic_threshold=0.45, skip_missing=True, use_fallback=False, fallbacks=None, extraction_workers=None, pdf_names=None, batch_size=STREAM_BATCH_SIZE, progress=None, job_id=None, timings=None):
+        """
+        Streaming screen_resumes: pdf_paths (and pdf_names / fallbacks) may be any
+        iterable, consumed batch_size entries at a time. Each micro-batch goes
+        through extraction, skills, embedding and scoring, is written to the
+        database, and its result dicts are yielded before the next one is read,
+        so memory stays bounded by batch_size however many resumes there are.
+        """
+        role = self.db.get_role(role_id)
+        if not role:
+            raise ValueError(f"Role id {role_id} not found")
+        
+        batch_size = max(1, int(batch_size))
+        paths = iter(pdf_paths)
+        names = iter(pdf_names) if pdf_names is not None else None
+        fallback_iter = iter(fallbacks) if fallbacks is not None else None
+        profiler = self._claim_profiler()
+        try:
+            while True:
+                batch = list(islice(paths, batch_size))
+                if not batch:
+                    return
+                batch_names = list(islice(names, len(batch))) if names is not None else None
+                batch_fallbacks = list(islice(fallback_iter, len(batch))) if fallback_iter is not None else None
+                results = self._screen([role], batch, semantic_threshold, skip_missing, use_fallback,
+                                       batch_fallbacks, extraction_workers, batch_names,
+                                       timings=timings, progress=progress, job_id=job_id, profiler=profiler)
+                yield from results.get(role_id, [])
+        finally:
+            if profiler is not None:
+                self._finish_profiler(profiler, kind="iter_screen_resumes", role_ids=[role_id], job_id=job_id)
+    
+    def screen_resumes_multi_role(self, pdf_paths, role_ids=None, semantic_threshold=0.45, skip_missing=True, use_fallback=False, fallbacks=None, extraction_workers=None, pdf_names=None, timings=None, checkpoint=None):
+        """
+        Screen one resume batch against several roles (all roles by default) in a single pass:
+        PDFs are extracted, skill-matched and embedded once, and every role x resume score
+        comes from one stacked matrix multiply. Returns {role_id: results}.
+        Pass a dict as timings to accumulate seconds spent per pipeline stage.
+        checkpoint: optional (batch run id, paths), recorded in the transaction that
+        stores the results (see ResumeDatabase.add_results).
+        """
+        roles = self.db.get_roles(role_ids)
+        if role_ids is not None:
+            missing = set(role_ids) - {role["id"] for role in roles}
+            if missing:
+                raise ValueError(f"Role id(s) {sorted(missing)} not found")
+        if not roles:
+            logger.info("No roles to screen against")
+            return {}
+        
+        profiler = self._claim_profiler()
+        try:
+            return self._screen(roles, pdf_paths, semantic_threshold, skip_missing, use_fallback,
+                                fallbacks, extraction_workers, pdf_names, timings, profiler=profiler,
+                                checkpoint=checkpoint)
+        finally:
+            if profiler is not None:
+                self._finish_profiler(profiler, kind="screen_resumes_multi_role",
+                                      role_ids=[role["id"] for role in roles])
+    
+    def _screen(self, roles, pdf_paths, semantic_threshold, skip_missing, use_fallback, fallbacks, extraction_workers, pdf_names, timings=None, progress=None, job_id=None, profiler=None, checkpoint=None):
+        """Shared pipeline: ingest the batch once, then score and store it for every role"""
+        timings = {} if timings is None else timings
+        progress = progress or (lambda stage, count: None)
+        with _stage(timings, "extract", profiler):
+            batch = self._ingest(pdf_paths, skip_missing, use_fallback, fallbacks, extraction_workers, pdf_names)
+        with _stage(timings, "store", profiler):
+            self._store_new_resumes(batch)
+        progress("extracted", len(pdf_paths))
+        resumes_texts = batch["texts"]
+        if profiler is not None:
+            profiler.record_resumes(batch["names"], batch["details"], resumes_texts)
+        if not resumes_texts:
+            logger.info("No resumes to screen")
+            if checkpoint is not None:
+                self.db.mark_batch_run_files(*checkpoint)
+            return {role["id"]: [] for role in roles}
+        return self._score_batch(roles, batch, semantic_threshold, timings, progress, job_id, profiler, checkpoint)
+    
+    def _score_batch(self, roles, batch, semantic_threshold, timings, progress, job_id=None, profiler=None, checkpoint=None, replace=False):
+        """
+        Skills, embeddings, scores and stored results for an ingested batch.
+        batch["exact_skills"], when present, holds already-known exact matches
+        per resume (None where unknown); only the unknown ones are extracted.
+        With replace, the new results supersede earlier ones for the same role and resume.
+        """
+        resumes_texts = batch["texts"]
+        resume_skills_exact = list(batch.get("exact_skills") or [None] * len(resumes_texts))
+        unknown = [i for i, exact in enumerate(resume_skills_exact) if exact is None]
+        with _stage(timings, "skills", profiler):
+            if unknown:
+                logger.info("Extracting skills from %d resume(s)...", len(unknown))
+                for i, exact in zip(unknown, self.skill_extractor.extract_skills_batch([resumes_texts[i] for i in unknown])):
+                    resume_skills_exact[i] = exact
+        progress("skilled", len(resumes_texts))
+        
+        with _stage(timings, "embed", profiler):
+            logger.info("Encoding %d resume(s)...", len(resumes_texts))
+            resume_embeddings = self.semantic_matcher.encode_resumes(resumes_texts)
+        progress("embedded", len(resumes_texts))
+        
+        with _stage(timings, "store", profiler):
+            # Failed or empty extractions stay out of the candidate index
+            indexed = [i for i, text in enumerate(resumes_texts) if text.strip()]
+            self.resume_index.add([batch["resume_ids"][i] for i in indexed], resume_embeddings.vectors[indexed])
+            if unknown:
+                self.db.set_exact_skills((batch["resume_ids"][i], "; ".join(sorted({s.lower() for s in resume_skills_exact[i]})))
+                                         for i in unknown)
+        
+        with _stage(timings, "score", profiler):
+            logger.info("Scoring against %d role(s) (threshold=%s)...", len(roles), semantic_threshold)
+            role_scores = self.semantic_matcher.score_roles(
+                [role["skills"] for role in roles],
+                [self._role_text(role) for role in roles],
+                resume_embeddings,
+                threshold=semantic_threshold,
+                role_vectors=self._load_role_embeddings(roles)
+            )
+        
+        all_results = {}
+        result_rows = []
+        for role, (semantic_matches, sim_scores) in zip(roles, role_scores):
+            results = []
+            for rid, path, exact, sem, sim, method in zip(batch["resume_ids"], batch["names"], resume_skills_exact, semantic_matches, sim_scores, batch["methods"]):
+                union = sorted(set([s.lower() for s in exact]).union({s.lower() for s in sem}))
+                matched_skills_text = "; ".join(union)
+                num_matched = len(union)
+                similarity_score = float(sim)
+                
+                result_rows.append((role["id"], rid, matched_skills_text, num_matched, similarity_score,
+                                    "; ".join(sem), semantic_threshold, job_id))
+                
+                results.append({
+                    "resume_id": rid,
+                    "pdf_path": path,
+                    "extraction_method": method,
+                    "matched_skills": matched_skills_text,
+                    "num_matched_skills": num_matched,
+                    "similarity_score": similarity_score
+                })
+            all_results[role["id"]] = results
+        
+        # Every role's results (and the batch run checkpoint) commit together
+        with _stage(timings, "store", profiler):
+            self.db.add_results(result_rows, checkpoint, replace=replace)
+        progress("scored", len(resumes_texts))
+        
+        SCREENED_RESUMES.inc(len(resumes_texts) * len(roles))
+        logger.info("Screening complete! Processed %d resume(s) for %d role(s)", len(resumes_texts), len(roles),
+                    extra={"resumes": len(resumes_texts), "roles": len(roles), "timings": dict(timings)})
+        write_textfile()
+        return all_results
+    
+    def rescreen_resumes(self, role_id, resume_ids=None, semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD, batch_size=STREAM_BATCH_SIZE, progress=None, job_id=None):
+        """
+        Screen already-stored resumes (all of them by default) for a role without
+        their PDFs: texts come compressed from the database and are decompressed
+        one batch at a time, and stored exact skill matches are reused, so there
+        is no extraction stage. Resumes without a stored text are skipped.
+        Results already stored for the role and a re-screened resume are replaced,
+        not duplicated. Returns the result dicts, like screen_resumes.
+        """
         role = self.db.get_role(role_id)
         if not role:
             raise ValueError(f"Role id {role_id} not found")
         
-        job_skills = role["skills"]
-        role_text = " ".join(job_skills) if job_skills else role["name"]
+        resume_ids = self.db.resume_ids_with_text() if resume_ids is None else list(dict.fromkeys(resume_ids))
+        batch_size = max(1, int(batch_size))
+        progress = progress or (lambda stage, count: None)
+        timings = {}
+        results = []
+        profiler = self._claim_profiler()
+        try:
+            for start in range(0, len(resume_ids), batch_size):
+                chunk = resume_ids[start:start + batch_size]
+                with _stage(timings, "load", profiler):
+                    stored = self.db.get_stored_resumes(chunk)
+                progress("extracted", len(chunk))
+                if len(stored) < len(chunk):
+                    SKIPPED_RESUMES.inc(len(chunk) - len(stored), reason="no_stored_text")
+                    logger.warning("%d resume(s) have no stored text -- skipping", len(chunk) - len(stored))
+                if not stored:
+                    continue
+                batch = {
+                    "resume_ids": [row["id"] for row in stored],
+                    "texts": [row["text"] for row in stored],
+                    "methods": [row["extraction_method"] for row in stored],
+                    "names": [row["pdf_path"] for row in stored],
+                    "exact_skills": [None if row["exact_skills"] is None else
+                                     [s.strip() for s in row["exact_skills"].split(";") if s.strip()]
+                                     for row in stored],
+                }
+                if profiler is not None:
+                    # Texts come from the database: nothing was extracted in this run
+                    profiler.record_resumes(batch["names"], [{"method": method, "reused": True, "ocr_pages": 0}
+                                                             for method in batch["methods"]], batch["texts"])
+                # A re-screen replaces the role's earlier results for these resumes
+                scored = self._score_batch([role], batch, semantic_threshold, timings, progress, job_id, profiler,
+                                           replace=True)
+                results.extend(scored[role_id])
+        finally:
+            if profiler is not None:
+                self._finish_profiler(profiler, kind="rescreen_resumes", role_ids=[role_id], job_id=job_id)
+        return results
+    
+    def rescore_role(self, role_id, old_skills):
+        """
+        Bring a role's stored results up to date after its skill list changed,
+        without touching any PDF: only added skills are compared against the
+        stored resume embeddings, removed skills are dropped from the semantic
+        matches, and the role-text similarity is one matrix-vector product.
+        Rows are updated in place; returns the number of rows re-scored.
+        """
+        role = self.db.get_role(role_id)
+        if not role:
+            raise ValueError(f"Role id {role_id} not found")
+        rows = self.db.get_result_rows(role_id)
+        if not rows:
+            return 0
+        
+        old_skills = set(old_skills)
+        added = [i for i, skill in enumerate(role["skills"]) if skill not in old_skills]
+        removed = old_skills - set(role["skills"])
+        logger.info("Re-scoring %d result(s) for role '%s' (+%d / -%d skill(s))...",
+                    len(rows), role["name"], len(added), len(removed))
+        
+        # Resumes indexed before the vector table existed are backfilled first
+        resume_ids = list(dict.fromkeys(row["resume_id"] for row in rows))
+        if self.resume_index.missing_ids(resume_ids):
+            self.rebuild_resume_index()
+        found_ids, vectors = self.resume_index.vectors(resume_ids)
         
+        skill_vectors, role_vector = self._load_role_embeddings([role])[0]
+        added_sims = {}
+        role_sims = {}
+        if found_ids:
+            added_matrix = skill_vectors[added] @ vectors.T if added else np.zeros((0, len(found_ids)), dtype=np.float32)
+            role_scores = vectors @ role_vector
+            for j, rid in enumerate(found_ids):
+                added_sims[rid] = added_matrix[:, j]
+                role_sims[rid] = float(role_scores[j])
+        
+        updates = []
+        stale = 0
+        for row in rows:
+            if row["semantic_skills"] is None:
+                # Older rows don't separate exact from semantic matches: edit matched_skills directly
+                exact = set()
+                semantic = {s.strip() for s in (row["matched_skills"] or "").split(";") if s.strip()}
+            else:
+                exact = {s.strip() for s in (row["exact_skills"] or "").split(";") if s.strip()}
+                semantic = {s.strip() for s in row["semantic_skills"].split(";") if s.strip()}
+            semantic -= removed
+            
+            rid = row["resume_id"]
+            if rid in added_sims:
+                threshold = row["semantic_threshold"] if row["semantic_threshold"] is not None else DEFAULT_SEMANTIC_THRESHOLD
+                semantic |= {role["skills"][i] for i, sim in zip(added, added_sims[rid]) if sim >= threshold}
+                similarity_score = role_sims[rid]
+            else:
+                stale += 1
+                similarity_score = row["similarity_score"]
+            
+            union = sorted(exact | {s.lower() for s in semantic})
+            updates.append((row["result_id"], "; ".join(union), len(union), similarity_score, "; ".join(sorted(semantic))))
+        
+        if stale:
+            logger.warning("%d result(s) have no stored resume embedding; kept their similarity score", stale)
+        self.db.update_results(updates)
+        logger.info("Re-scored %d result(s) in place", len(updates))
+        return len(updates)
+    
+    def find_candidates(self, role_id=None, skills=None, top_k=10, min_score=None):
+        """
+        Rank every resume screened so far against a role (or an ad-hoc skill list)
+        without re-reading any PDFs. Returns up to top_k dicts, best first, with
+        similarity_score >= min_score when given.
+        """
+        if role_id is not None:
+            role = self.db.get_role(role_id)
+            if not role:
+                raise ValueError(f"Role id {role_id} not found")
+        elif skills:
+            role = {"name": "", "skills": [s.strip().lower() for s in skills if s.strip()]}
+        else:
+            raise ValueError("Pass a role_id or a list of skills")
+        
+        if role_id is not None:
+            query = self._load_role_embeddings([role])[0][1]
+        else:
+            query = self.semantic_matcher.encode([self._role_text(role)])[0]
+        hits = self.resume_index.search(query, top_k=top_k, min_score=min_score)
+        meta = self.db.get_resumes([rid for rid, _ in hits])
+        return [{
+            "resume_id": rid,
+            "pdf_path": meta.get(rid, {}).get("pdf_path"),
+            "extraction_method": meta.get(rid, {}).get("extraction_method"),
+            "similarity_score": score
+        } for rid, score in hits]
+    
+    def rebuild_resume_index(self, batch_size=256):
+        """Index stored resumes that have no vector yet (e.g. screened before the index existed)"""
+        added = 0
+        for rows in self.db.iter_resume_texts(batch_size):
+            missing = set(self.resume_index.missing_ids([rid for rid, _ in rows]))
+            rows = [(rid, text) for rid, text in rows if rid in missing and text.strip()]
+            if rows:
+                embeddings = self.semantic_matcher.encode_resumes([text for _, text in rows])
+                self.resume_index.add([rid for rid, _ in rows], embeddings.vectors)
+                added += len(rows)
+        logger.info("Resume index rebuilt: %d resume(s) added, %d indexed", added, len(self.resume_index))
+        return added
+    
+    @staticmethod
+    def _role_text(role):
+        return " ".join(role["skills"]) if role["skills"] else role["name"]
+    
+    def _store_role_embeddings(self, role_id, name, skills_text):
+        """Encode a role's skills and role text once, at save time"""
+        role = {"id": role_id, "name": name, "skills_text": skills_text,
+                "skills": [s.strip() for s in skills_text.split(";") if s.strip()]}
+        self._load_role_embeddings([role], refresh=True)
+    
+    def _load_role_embeddings(self, roles, refresh=False):
+        """
+        Stored (skill_vectors, role_vector) per role, in order. Roles without
+        embeddings for the current model and skills (saved before this existed,
+        edited elsewhere, or after a model change) are encoded and stored now.
+        """
+        model_tag = self.semantic_matcher.model_tag
+        stored = {} if refresh else self.db.get_role_embeddings([role["id"] for role in roles], model_tag)
+        missing = [role for role in roles if role["id"] not in stored]
+        if missing:
+            encoded = self.semantic_matcher.encode_roles(
+                [role["skills"] for role in missing],
+                [self._role_text(role) for role in missing]
+            )
+            for role, (skill_vectors, role_vector) in zip(missing, encoded):
+                self.db.save_role_embeddings(role["id"], model_tag, role["skills_text"], skill_vectors, role_vector)
+                stored[role["id"]] = (skill_vectors, role_vector)
+        return [stored[role["id"]] for role in roles]
+    
+    def _ingest(self, pdf_paths, skip_missing, use_fallback, fallbacks, extraction_workers, pdf_names):
+        """
+        Extract (or reuse) every resume in the batch; returns ids, texts, methods, names
+        and per-file extraction details (method, ocr_pages, seconds). New resumes have
+        id None until _store_new_resumes writes them.
+        """
         resumes_texts = []
         extraction_methods = []
+        extraction_details = []
         resume_ids = []
         valid_paths = []
         fallbacks = fallbacks or [None] * len(pdf_paths)
         
-        for i, path in enumerate(pdf_paths):
-            if not path or not Path(path).exists():
-                msg = f"[WARN] PDF not found: {path}"
+        # Read each source once (file-like uploads can only be consumed once)
+        sources = [load_pdf_source(src) for src in pdf_paths]
+        names = [pdf_names[i] if pdf_names and i < len(pdf_names) and pdf_names[i] else pdf_source_name(src, i)
+                 for i, src in enumerate(pdf_paths)]
+        
+        # Hash every existing PDF; files seen before reuse their stored extraction
+        existing = [i for i, src in enumerate(sources) if src is not None]
+        hashes = {i: compute_pdf_hash(sources[i]) for i in existing}
+        known = {}
+        for i in existing:
+            if hashes[i] not in known:
+                known[hashes[i]] = self.db.find_resume_by_hash(hashes[i])
+        
+        # Extract each new file once in parallel; results come back in input order
+        to_extract = []
+        queued = set()
+        for i in existing:
+            if known[hashes[i]] is None and hashes[i] not in queued:
+                queued.add(hashes[i])
+                to_extract.append(i)
+        logger.info("Extracting %d new PDF(s) in parallel (%d already seen)...",
+                    len(to_extract), len(existing) - len(to_extract))
+        results_in_order = extract_texts_parallel([sources[i] for i in to_extract], max_workers=extraction_workers,
+                                                  details=True)
+        extracted = {hashes[i]: result for i, result in zip(to_extract, results_in_order)}
+        
+        # New resumes are written in one transaction after the loop; until then
+        # resume_ids holds None and new_row_refs the row's index in new_rows
+        new_rows = []
+        new_row_refs = []
+        for i, path in enumerate(names):
+            cached = known.get(hashes[i]) if i in hashes else None
+            if cached:
+                logger.info("%s -- Reusing %s (same content)", path,
+                            f"resume {cached['id']}" if cached["id"] else "earlier upload")
+                resume_ids.append(cached["id"])
+                new_row_refs.append(cached.get("row"))
+                resumes_texts.append(cached["text"])
+                extraction_methods.append(cached["extraction_method"])
+                extraction_details.append({"method": cached["extraction_method"], "reused": True, "ocr_pages": 0})
+                valid_paths.append(path)
+                continue
+            
+            if i not in hashes:
+                SKIPPED_RESUMES.inc(reason="missing")
                 if skip_missing:
-                    print(msg + " -- skipping")
+                    logger.warning("PDF not found: %s -- skipping", path)
                     continue
                 else:
-                    print(msg + " -- using fallback/empty")
+                    logger.warning("PDF not found: %s -- using fallback/empty", path)
                     text = fallbacks[i] if (use_fallback and i < len(fallbacks) and fallbacks[i]) else ""
                     method = "fallback" if text else None
+                    info = {"method": method, "ocr_pages": 0}
             else:
-                print(f"[INFO] Extracting: {path}")
-                text = extract_text_from_pdf(path)
-                method = "extracted"
-                print(f"[INFO] Method: {method}, Length: {len(text or '')}")
+                text, error, info = extracted[hashes[i]]
+                # The path that actually produced the text: pymupdf, pymupdf+ocr, pdfplumber or ocr
+                method = info["method"]
+                if error:
+                    logger.warning("Extraction failed for %s: %s", path, error, extra={"pdf": path, "error": error})
+                    method = "failed"
+                logger.info("%s -- Method: %s, Length: %d", path, method, len(text or ""),
+                            extra={"pdf": path, "method": method, "ocr_pages": info["ocr_pages"],
+                                   "seconds": round(info.get("seconds", 0.0), 4)})
                 
                 if (not text or len(text.strip()) == 0) and use_fallback and i < len(fallbacks) and fallbacks[i]:
                     text = fallbacks[i]
                     method = "fallback"
             
-            resume_id = self.db.add_resume(path, text or "", method)
-            resume_ids.append(resume_id)
+            content_hash = hashes.get(i) if method not in ("failed", "fallback", None) and (text or "").strip() else None
+            if content_hash:
+                known[content_hash] = {"id": None, "row": len(new_rows), "text": text, "extraction_method": method}
+            resume_ids.append(None)
+            new_row_refs.append(len(new_rows))
+            new_rows.append((path, text or "", method, content_hash))
             resumes_texts.append(text or "")
             extraction_methods.append(method)
+            extraction_details.append(info)
             valid_paths.append(path)
         
-        if not resumes_texts:
-            print("[INFO] No resumes to screen")
-            return []
-        
-        print(f"[INFO] Extracting skills from {len(resumes_texts)} resume(s)...")
-        resume_skills_exact = [self.skill_extractor.extract_skills(t) for t in resumes_texts]
-        
-        print(f"[INFO] Computing semantic matches (threshold={semantic_threshold})...")
-        semantic_matches = self.semantic_matcher.compute_skill_matches(job_skills, resumes_texts, threshold=semantic_threshold)
-        
-        print("[INFO] Computing similarity scores...")
-        sim_scores = self.semantic_matcher.compute_similarity_scores(role_text, resumes_texts)
-        
-        results = []
-        for rid, path, exact, sem, sim, method in zip(resume_ids, valid_paths, resume_skills_exact, semantic_matches, sim_scores, extraction_methods):
-            union = sorted(set([s.lower() for s in exact]).union({s.lower() for s in sem}))
-            matched_skills_text = "; ".join(union)
-            num_matched = len(union)
-            similarity_score = float(sim)
-            
-            self.db.add_result(role_id, rid, matched_skills_text, num_matched, similarity_score)
-            
-            results.append({
-                "resume_id": rid,
-                "pdf_path": path,
-                "extraction_method": method,
-                "matched_skills": matched_skills_text,
-                "num_matched_skills": num_matched,
-                "similarity_score": similarity_score
-            })
-        
-        print(f"[INFO] Screening complete! Processed {len(results)} resume(s)")
-        return results
+        return {"resume_ids": resume_ids, "texts": resumes_texts, "methods": extraction_methods, "names": valid_paths,
+                "details": extraction_details, "new_rows": new_rows, "new_row_refs": new_row_refs}
+    
+    def _store_new_resumes(self, batch):
+        """Write an ingested batch's new resumes in one transaction and fill in their ids"""
+        if batch["new_rows"]:
+            new_ids = self.db.add_resumes(batch["new_rows"])
+            batch["resume_ids"] = [new_ids[ref] if ref is not None else rid
+                                   for rid, ref in zip(batch["resume_ids"], batch["new_row_refs"])]
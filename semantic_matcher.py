@@ -4,36 +4,245 @@ Author: Gladiator2005
 Date: 2025-11-09
 """
 
-from sentence_transformers import SentenceTransformer, util
-from config import SENTENCE_TRANSFORMER_MODEL, DEFAULT_SEMANTIC_THRESHOLD
+import threading
+import time
+import numpy as np
+from config import (SENTENCE_TRANSFORMER_MODEL, DEFAULT_SEMANTIC_THRESHOLD, EMBEDDING_CACHE_ENABLED, SKILLS_DB,
+                    ENCODER_BACKEND, ENCODE_TOKEN_BUDGET, ENCODE_MAX_BATCH_SIZE)
+from embedding_cache import EmbeddingCache, embedding_key
+from encoders import encoder_loader, model_tag
+from model_registry import get_model
+from metrics import counter, histogram, SIZE_BUCKETS
+
+ENCODE_BATCH_SIZE = histogram("resume_encode_batch_size", "Texts per encoder forward pass", ("backend",),
+                              buckets=SIZE_BUCKETS)
+ENCODE_BATCH_TOKENS = histogram("resume_encode_batch_padded_tokens", "Padded tokens (size x longest) per forward pass",
+                                ("backend",), buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768))
+ENCODE_BATCH_SECONDS = histogram("resume_encode_batch_seconds", "Time per encoder forward pass", ("backend",))
+ENCODED_TEXTS = counter("resume_encoded_texts_total", "Texts run through the encoder", ("backend",))
+EMBEDDING_CACHE_LOOKUPS = counter("resume_embedding_cache_lookups_total", "Resume embedding cache lookups",
+                                  ("result",))
+
+
+def plan_batches(lengths, token_budget=ENCODE_TOKEN_BUDGET, max_batch_size=ENCODE_MAX_BATCH_SIZE):
+    """
+    Split texts into encode batches by token length instead of a fixed count.
+    Texts are taken longest first, so each batch holds texts of similar length
+    (little padding), and a batch grows until batch size x its longest text
+    would exceed token_budget, which caps activation memory per forward pass.
+    Returns lists of indices into lengths.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    batch = []
+    for i in order:
+        # Sorted descending, so the batch's first text is its longest
+        longest = lengths[batch[0]] if batch else lengths[i]
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * max(longest, 1) > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class ResumeEmbeddings:
+    """Batch of L2-normalized resume embeddings, encoded once and shared by all scoring stages"""
+
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
 
 class SemanticMatcher:
-    def __init__(self):
-        self.model = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL)
-    
-    def compute_skill_matches(self, job_skills, resumes_texts, threshold=DEFAULT_SEMANTIC_THRESHOLD):
-        if not job_skills or not resumes_texts:
-            return [[] for _ in resumes_texts]
-        
-        skill_emb = self.model.encode(job_skills, convert_to_tensor=True)
-        resume_emb = self.model.encode(resumes_texts, convert_to_tensor=True)
-        sim_matrix = util.pytorch_cos_sim(skill_emb, resume_emb).cpu().numpy()
-        
-        matched = []
-        for j in range(sim_matrix.shape[1]):
-            matched_skills = []
-            for i, skill in enumerate(job_skills):
-                if sim_matrix[i, j] >= threshold:
-                    matched_skills.append(skill)
-            matched.append(sorted(set(matched_skills)))
-        
-        return matched
-    
-    def compute_similarity_scores(self, role_text, resumes_texts):
-        if not resumes_texts:
+    # Process-wide skill embeddings keyed by (model tag, skill); the first
+    # lookup encodes all of SKILLS_DB in one batch, so roles built from known
+    # skills never touch the transformer
+    _skill_vectors = {}
+    _skills_db_loaded = set()
+    _skill_vectors_lock = threading.Lock()
+
+    def __init__(self, cache=None, backend=None):
+        self.model_name = SENTENCE_TRANSFORMER_MODEL
+        self.backend = backend or ENCODER_BACKEND
+        self._loader = encoder_loader(self.backend)
+        # Tags every stored embedding, so switching backends never mixes vectors
+        self.model_tag = model_tag(self.model_name, self.backend)
+        self._model = None
+        self.last_batch_stats = None
+        # cache=False disables the embedding cache regardless of EMBEDDING_CACHE_ENABLED
+        if cache is None and EMBEDDING_CACHE_ENABLED:
+            cache = EmbeddingCache()
+        self.cache = cache if cache is not False else None
+
+    @property
+    def model(self):
+        """The shared transformer, loaded on first use"""
+        if self._model is None:
+            self._model = get_model(f"encoder:{self.backend}", self.model_name, self._loader)
+        return self._model
+
+    def encode(self, texts):
+        """
+        Encode texts into L2-normalized float32 vectors (cosine similarity becomes a dot product).
+        Texts are scheduled into length-bucketed, token-budgeted batches (see plan_batches);
+        rows come back in input order, and the batch statistics are kept in last_batch_stats.
+        """
+        texts = list(texts)
+        dim = self.model.get_sentence_embedding_dimension()
+        if not texts:
+            return np.zeros((0, dim), dtype=np.float32)
+
+        lengths = self.token_lengths(texts)
+        batches = plan_batches(lengths)
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        for batch in batches:
+            started = time.perf_counter()
+            encoded = self.model.encode([texts[i] for i in batch], batch_size=len(batch),
+                                        convert_to_numpy=True, normalize_embeddings=True)
+            vectors[batch] = np.asarray(encoded, dtype=np.float32)
+            ENCODE_BATCH_SECONDS.observe(time.perf_counter() - started, backend=self.backend)
+            ENCODE_BATCH_SIZE.observe(len(batch), backend=self.backend)
+            ENCODE_BATCH_TOKENS.observe(len(batch) * max(lengths[batch[0]], 1), backend=self.backend)
+        ENCODED_TEXTS.inc(len(texts), backend=self.backend)
+
+        padded = sum(len(batch) * max(lengths[batch[0]], 1) for batch in batches)
+        self.last_batch_stats = {
+            "texts": len(texts),
+            "batches": len(batches),
+            "mean_batch_size": len(texts) / len(batches),
+            "tokens": int(sum(lengths)),
+            "padded_tokens": int(padded),
+            "padding_ratio": 1.0 - sum(lengths) / padded if padded else 0.0,
+        }
+        return vectors
+
+    def token_lengths(self, texts):
+        """Tokens per text as the model will see them (truncated to max_seq_length)"""
+        max_len = getattr(self.model, "max_seq_length", None) or 512
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            # Rough estimate for encoders that don't expose their tokenizer
+            return [min(max_len, len(t) // 4 + 2) for t in texts]
+        encoded = tokenizer(texts, truncation=True, max_length=max_len, add_special_tokens=True,
+                            return_attention_mask=False, return_token_type_ids=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def encode_skills(self, skills):
+        """Embeddings of a skill list (one row per skill), served from the process-wide skill cache"""
+        skills = list(skills)
+        cache = SemanticMatcher._skill_vectors
+        with SemanticMatcher._skill_vectors_lock:
+            missing = [s for s in dict.fromkeys(skills) if (self.model_tag, s) not in cache]
+            if missing:
+                if self.model_tag not in SemanticMatcher._skills_db_loaded:
+                    missing = list(dict.fromkeys(missing + list(SKILLS_DB)))
+                    SemanticMatcher._skills_db_loaded.add(self.model_tag)
+                cache.update(((self.model_tag, s), v) for s, v in zip(missing, self.encode(missing)))
+            if not skills:
+                return self.encode([])
+            return np.stack([cache[(self.model_tag, s)] for s in skills])
+
+    def encode_roles(self, roles_skills, role_texts):
+        """One (skill_vectors, role_vector) pair per role, ready to store with the role or pass to score_roles"""
+        role_texts = list(role_texts)
+        role_vectors = self.encode(role_texts)
+        return [(self.encode_skills(skills), role_vectors[k]) for k, skills in enumerate(roles_skills)]
+
+    def encode_resumes(self, resumes_texts):
+        """
+        Encode a resume batch once; pass the result to the scoring methods below.
+        Texts already in the embedding cache skip the transformer entirely.
+        """
+        resumes_texts = list(resumes_texts)
+        if self.cache is None or not resumes_texts:
+            return ResumeEmbeddings(self.encode(resumes_texts))
+
+        keys = [embedding_key(t, self.model_tag) for t in resumes_texts]
+        cached = self.cache.get_many(keys)
+        hits = sum(1 for key in keys if key in cached)
+        EMBEDDING_CACHE_LOOKUPS.inc(hits, result="hit")
+        EMBEDDING_CACHE_LOOKUPS.inc(len(keys) - hits, result="miss")
+
+        # Encode each distinct missing text once, even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, resumes_texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            fresh = self.encode(list(missing.values()))
+            new_items = list(zip(missing.keys(), fresh))
+            self.cache.put_many(new_items)
+            cached.update(new_items)
+
+        return ResumeEmbeddings(np.stack([cached[k] for k in keys]))
+
+    def _as_embeddings(self, resumes):
+        if isinstance(resumes, ResumeEmbeddings):
+            return resumes
+        return self.encode_resumes(resumes)
+
+    def skill_similarity_matrix(self, job_skills, resumes):
+        """Full skill x resume cosine similarity matrix"""
+        resumes = self._as_embeddings(resumes)
+        if not job_skills or not len(resumes):
+            return np.zeros((len(job_skills or []), len(resumes)), dtype=np.float32)
+        return self.encode_skills(job_skills) @ resumes.vectors.T
+
+    @staticmethod
+    def threshold_matches(job_skills, sim_matrix, threshold=DEFAULT_SEMANTIC_THRESHOLD):
+        """Per-resume sorted list of skills whose similarity reaches the threshold"""
+        mask = np.asarray(sim_matrix) >= threshold
+        skills = np.asarray(job_skills, dtype=object)
+        return [sorted(set(skills[mask[:, j]])) for j in range(mask.shape[1])]
+
+    def compute_skill_matches(self, job_skills, resumes, threshold=DEFAULT_SEMANTIC_THRESHOLD, return_matrix=False):
+        """Match job skills against resumes (texts or a ResumeEmbeddings batch)"""
+        resumes = self._as_embeddings(resumes)
+        sim_matrix = self.skill_similarity_matrix(job_skills, resumes)
+        if not job_skills:
+            matched = [[] for _ in range(len(resumes))]
+        else:
+            matched = self.threshold_matches(job_skills, sim_matrix, threshold)
+        return (matched, sim_matrix) if return_matrix else matched
+
+    def compute_similarity_scores(self, role_text, resumes):
+        """Cosine similarity of the role text to each resume (texts or a ResumeEmbeddings batch)"""
+        resumes = self._as_embeddings(resumes)
+        if not len(resumes):
             return []
-        
-        role_emb = self.model.encode([role_text], convert_to_tensor=True)
-        resume_emb = self.model.encode(resumes_texts, convert_to_tensor=True)
-        
-        return util.pytorch_cos_sim(role_emb, resume_emb).cpu().numpy().flatten()
\ No newline at end of file
+        return (self.encode([role_text]) @ resumes.vectors.T).flatten()
+
+    def score_roles(self, roles_skills, role_texts, resumes, threshold=DEFAULT_SEMANTIC_THRESHOLD, role_vectors=None):
+        """
+        Score several roles against one resume batch with a single stacked matrix multiply.
+        roles_skills: one skill list per role; role_texts: one role text per role;
+        role_vectors: optional precomputed encode_roles() output, skipping the encoder.
+        Returns one (semantic_matches, similarity_scores) pair per role.
+        """
+        resumes = self._as_embeddings(resumes)
+        if not len(resumes):
+            return [([], np.zeros(0, dtype=np.float32)) for _ in role_texts]
+        if role_vectors is None:
+            role_vectors = self.encode_roles(roles_skills, role_texts)
+
+        # Stack every role's skill rows, then the role-text rows, and multiply once
+        blocks = [skill_vectors for skill_vectors, _ in role_vectors]
+        blocks.append(np.stack([role_vector for _, role_vector in role_vectors]))
+        stacked = np.vstack(blocks) @ resumes.vectors.T
+        role_sims = stacked[-len(role_vectors):]
+
+        scores = []
+        offset = 0
+        for k, skills in enumerate(roles_skills):
+            if skills:
+                sim_matrix = stacked[offset:offset + len(skills)]
+                matched = self.threshold_matches(skills, sim_matrix, threshold)
+            else:
+                matched = [[] for _ in range(len(resumes))]
+            offset += len(skills)
+            scores.append((matched, role_sims[k]))
+        return scores
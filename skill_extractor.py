@@ -4,17 +4,29 @@ Author: Gladiator2005
 Date: 2025-11-09
 """
 
-import re
-import spacy
-from spacy.matcher import PhraseMatcher
+import time
+from skill_matcher import SkillAutomaton, DB_VARIANTS, DB_VARIANTS_RE, extract_technical_skills_line
+from model_registry import get_model
+from metrics import counter, histogram, SIZE_BUCKETS
 
 try:
-    from config import SKILLS_DB, SPACY_MODEL
+    from config import (SKILLS_DB, SPACY_MODEL, SPACY_BATCH_SIZE, SPACY_N_PROCESS, SPACY_MATCHER_COMPONENTS,
+                        SKILL_MATCHER_BACKEND)
 except ImportError:
     SPACY_MODEL = "en_core_web_sm"
     SKILLS_DB = [
         "python", "java", "sql", "react", "docker", "kubernetes"
     ]
+    SPACY_BATCH_SIZE = 64
+    SPACY_N_PROCESS = 1
+    SPACY_MATCHER_COMPONENTS = []
+    SKILL_MATCHER_BACKEND = "spacy"
+
+SKILL_BATCH_SECONDS = histogram("resume_skill_extraction_seconds", "Time per extract_skills_batch call", ("backend",))
+SKILL_TEXTS = counter("resume_skill_texts_total", "Texts run through skill extraction", ("backend",))
+SKILL_FALLBACKS = counter("resume_skill_noun_chunk_fallbacks_total",
+                          "Texts with no direct match that went through the noun-chunk fallback")
+SKILLS_PER_TEXT = histogram("resume_skills_per_text", "Skills found per text", buckets=SIZE_BUCKETS)
 
 
 def _safe_load_spacy_model(model_name: str):
@@ -22,6 +34,7 @@ def _safe_load_spacy_model(model_name: str):
     Try to load a spaCy model. If not installed, attempt to download it.
     If download fails (e.g. no network), fall back to blank('en') pipeline.
     """
+    import spacy
     try:
         return spacy.load(model_name)
     except OSError:
@@ -35,42 +48,56 @@ def _safe_load_spacy_model(model_name: str):
             return spacy.blank("en")
 
 
+def load_spacy_model(model_name: str):
+    """Shared pipeline for model_name; loaded (or downloaded) once per process"""
+    return get_model("spacy", model_name, _safe_load_spacy_model)
+
+
 class SkillExtractor:
     """Extract skills from text using multiple methods"""
 
-    def __init__(self, skills_list=None, model_name: str = None):
+    def __init__(self, skills_list=None, model_name: str = None, batch_size: int = SPACY_BATCH_SIZE,
+                 n_process: int = SPACY_N_PROCESS, matcher_components=None, backend: str = None):
         self.skills = [s.strip().lower() for s in (skills_list or SKILLS_DB) if s.strip()]
-        chosen_model = model_name or SPACY_MODEL
-        self.nlp = _safe_load_spacy_model(chosen_model)
-
-        # Phrase matcher on lowercase for robust exact matching
-        self.matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
-        patterns = [self.nlp.make_doc(skill) for skill in self.skills]
-        if patterns:
-            self.matcher.add("SKILLS", patterns)
+        self.model_name = model_name or SPACY_MODEL
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.backend = backend or SKILL_MATCHER_BACKEND
+        if self.backend not in ("spacy", "automaton"):
+            raise ValueError(f"Unknown skill matcher backend: {self.backend}")
+        self._components = SPACY_MATCHER_COMPONENTS if matcher_components is None else matcher_components
+        self._nlp = None
+        self._matcher = None
+
+        # The automaton backend needs spaCy only for the rare noun-chunk fallback;
+        # the spaCy pipeline itself is loaded on first use
+        self.automaton = SkillAutomaton(self.skills, DB_VARIANTS) if self.backend == "automaton" else None
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = load_spacy_model(self.model_name)
+        return self._nlp
+
+    @property
+    def matcher_components(self):
+        """Pipeline components kept on the hot path; all others are disabled"""
+        return [c for c in self._components if c in self.nlp.pipe_names]
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            from spacy.matcher import PhraseMatcher
+            # Phrase matcher on lowercase for robust exact matching
+            self._matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+            patterns = [self.nlp.make_doc(skill) for skill in self.skills]
+            if patterns:
+                self._matcher.add("SKILLS", patterns)
+        return self._matcher
 
     def extract_technical_skills_line(self, text):
         """Extract skills from an explicit 'Technical Skills:' line, if present."""
-        if not text:
-            return []
-
-        m = re.search(r"technical skills\s*[:\-]\s*(.+)", text, flags=re.I)
-        if not m:
-            # Line-by-line fallback with tolerant matching
-            for line in text.splitlines():
-                if re.match(r"^\s*technical skills\s*[:\-]?", line, flags=re.I):
-                    remainder = re.sub(r"^\s*technical skills\s*[:\-]?\s*", "", line, flags=re.I)
-                    if remainder:
-                        m = re.match(r"(.+)", remainder)
-                        break
-
-        if not m:
-            return []
-
-        skills_text = m.group(1)
-        parts = re.split(r"[,;•\n]+", skills_text)
-        parts = [p.strip() for p in parts if p.strip()]
-        return parts
+        return extract_technical_skills_line(text)
 
     def extract_skills(self, text):
         """
@@ -82,8 +109,45 @@ class SkillExtractor:
         """
         if not text:
             return []
+        return self.extract_skills_batch([text], n_process=1)[0]
 
-        doc = self.nlp(text)
+    def extract_skills_batch(self, texts, batch_size=None, n_process=None):
+        """
+        Batched extract_skills built on nlp.pipe. Only the matcher components
+        run for every text; the full pipeline (parser, lemmatizer) runs only on
+        texts that reach the noun-chunk fallback.
+        """
+        started = time.perf_counter()
+        texts = [t or "" for t in texts]
+        batch_size = batch_size or self.batch_size
+        n_process = n_process or self.n_process
+
+        if self.backend == "automaton":
+            results = [self._match_skills_automaton(text) if text else set() for text in texts]
+        else:
+            # Disable per call rather than with select_pipes: the pipeline is
+            # shared across threads and select_pipes mutates it
+            keep = self.matcher_components
+            disable = [name for name in self.nlp.pipe_names if name not in keep]
+            docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+            results = [self._match_skills(doc, text) if text else set() for text, doc in zip(texts, docs)]
+
+        # 4) Noun-chunk best effort, with a lazy full parse of just these texts
+        fallback = [i for i, found in enumerate(results) if not found and texts[i]]
+        if fallback and self.nlp.has_pipe("parser"):
+            SKILL_FALLBACKS.inc(len(fallback))
+            docs = self.nlp.pipe([texts[i] for i in fallback], batch_size=batch_size)
+            for i, doc in zip(fallback, docs):
+                results[i] = self._noun_chunk_skills(doc)
+
+        SKILL_BATCH_SECONDS.observe(time.perf_counter() - started, backend=self.backend)
+        SKILL_TEXTS.inc(len(texts), backend=self.backend)
+        for found in results:
+            SKILLS_PER_TEXT.observe(len(found))
+        return [sorted(found) for found in results]
+
+    def _match_skills(self, doc, text):
+        """Strategies 1-3 on a tokenized doc"""
         found = set()
 
         # 1) PhraseMatcher
@@ -91,24 +155,33 @@ class SkillExtractor:
         for _, start, end in matches:
             found.add(doc[start:end].text.lower().strip())
 
-        # 2) Regex variants
-        db_variants = ["postgresql", "postgres", "mysql", "mongodb", "oracle", "sql server"]
-        for pat in db_variants:
-            if re.search(r"\b" + re.escape(pat) + r"\b", text, flags=re.I):
-                found.add(pat.lower())
+        # 2) Regex variants (one precompiled alternation)
+        for m in DB_VARIANTS_RE.finditer(text):
+            found.add(m.group(1).lower())
 
         # 3) Technical Skills line
         for s in self.extract_technical_skills_line(text):
             found.add(s.lower())
 
-        # 4) Noun-chunk best effort
-        if not found and hasattr(doc, "noun_chunks"):
-            for chunk in doc.noun_chunks:
-                ctext = chunk.text.lower().strip()
-                if len(ctext) >= 3 and any(tok.lemma_.lower() in self.skills for tok in chunk):
-                    found.add(ctext)
+        return found
 
-        return sorted(found)
+    def _match_skills_automaton(self, text):
+        """Strategies 1-3 in one linear pass, without spaCy"""
+        found = self.automaton.find_all(text)
+        for s in extract_technical_skills_line(text):
+            found.add(s.lower())
+        return found
+
+    def _noun_chunk_skills(self, doc):
+        """Strategy 4 on a fully parsed doc"""
+        found = set()
+        if not doc.has_annotation("DEP"):
+            return found
+        for chunk in doc.noun_chunks:
+            ctext = chunk.text.lower().strip()
+            if len(ctext) >= 3 and any(tok.lemma_.lower() in self.skills for tok in chunk):
+                found.add(ctext)
+        return found
 
 
 if __name__ == "__main__":
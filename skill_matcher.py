@@ -0,0 +1,249 @@
+"""
+Pure-Python skill matching engine (no spaCy in the hot path)
+Author: Gladiator2005
+Date: 2025-11-09
+"""
+
+import re
+from collections import deque
+
+# Precompiled patterns for the explicit 'Technical Skills:' line
+TECH_SKILLS_INLINE_RE = re.compile(r"technical skills\s*[:\-]\s*(.+)", re.I)
+TECH_SKILLS_LINE_RE = re.compile(r"^\s*technical skills\s*[:\-]?", re.I)
+TECH_SKILLS_PREFIX_RE = re.compile(r"^\s*technical skills\s*[:\-]?\s*", re.I)
+TECH_SKILLS_SPLIT_RE = re.compile(r"[,;•\n]+")
+
+# Well-known variants matched with regex word boundaries
+DB_VARIANTS = ["postgresql", "postgres", "mysql", "mongodb", "oracle", "sql server"]
+DB_VARIANTS_RE = re.compile(
+    r"\b(" + "|".join(re.escape(v) for v in sorted(DB_VARIANTS, key=len, reverse=True)) + r")\b", re.I
+)
+
+# Punctuation the spaCy English tokenizer strips from the start / end of a
+# whitespace-delimited chunk. Anywhere else inside a chunk it only splits on
+# the infix rules in _is_infix, so e.g. 'x"docker' or 'jwt/' stay one token.
+_PREFIX_CHARS = set("([{<)]}>+\"'“‘«‚„`´§%=—–#*&_$£€¥…,:;!?¿¡")
+_SUFFIX_CHARS = set(")]}>([{<\"'”’»`´…,:;!?#*&_—–.")
+
+# Simplified spaCy URL_MATCH: optional scheme and user@, dotted host, lowercase TLD, path
+_URL_RE = re.compile(
+    r"^(?:[\w+\-.]{2,}://)?(?:\S+(?::\S*)?@)?"
+    r"(?:(?:[A-Za-z0-9\u00a1-\uffff][A-Za-z0-9\u00a1-\uffff_-]{0,62})?[A-Za-z0-9\u00a1-\uffff]\.)+"
+    r"[a-z]{2,63}(?::\d{2,5})?(?:[/?#]\S*)?$"
+)
+
+
+def extract_technical_skills_line(text):
+    """Extract skills from an explicit 'Technical Skills:' line, if present."""
+    if not text:
+        return []
+
+    m = TECH_SKILLS_INLINE_RE.search(text)
+    if not m:
+        # Line-by-line fallback with tolerant matching
+        for line in text.splitlines():
+            if TECH_SKILLS_LINE_RE.match(line):
+                remainder = TECH_SKILLS_PREFIX_RE.sub("", line)
+                if remainder:
+                    m = re.match(r"(.+)", remainder)
+                    break
+
+    if not m:
+        return []
+
+    parts = TECH_SKILLS_SPLIT_RE.split(m.group(1))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _is_word_char(c):
+    return c.isalnum() or c == "_"
+
+
+def _is_infix(raw, k):
+    """Does the tokenizer split on the infix character at raw[k]?"""
+    if k <= 0 or k >= len(raw) - 1:
+        return False
+    before, c, after = raw[k - 1], raw[k], raw[k + 1]
+    if before.isspace() or after.isspace():
+        return False  # infixes only split inside a whitespace-delimited chunk
+    if c in "~—–…" or (c == "." and "." in (before, after)):
+        return True
+    if c == ",":
+        return before.isalpha() and after.isalpha()
+    if c in "-/:<>=":
+        return before.isalnum() and after.isalpha()
+    if c == ".":
+        return before.islower() and after.isupper()
+    return False
+
+
+def _token_start(raw, start):
+    """Is raw[start] the first character of a spaCy token?"""
+    if start == 0 or raw[start - 1].isspace() or _is_infix(raw, start - 1):
+        return True
+    # Otherwise only prefix punctuation may sit between the whitespace and the match
+    j = start - 1
+    while j >= 0 and not raw[j].isspace():
+        if raw[j] not in _PREFIX_CHARS:
+            return False
+        j -= 1
+    return True
+
+
+def _token_end(raw, end):
+    """Is raw[end - 1] the last character of a spaCy token?"""
+    if end == len(raw) or raw[end].isspace() or _is_infix(raw, end):
+        return True
+    # Single letters followed by a period are tokenizer exceptions ("r.", "C.")
+    if raw[end] == "." and end >= 1 and raw[end - 1].isalpha() and (end < 2 or not raw[end - 2].isalnum()):
+        return False
+    # A period after one capital letter is not split off ("X."), after two it is ("SQL.")
+    if raw[end] == "." and raw[end - 1].isupper() and not (end >= 2 and raw[end - 2].isupper()):
+        return False
+    # Otherwise the rest of the chunk must be suffix punctuation or a possessive
+    j = end
+    while j < len(raw) and not raw[j].isspace():
+        if raw[j] in "'’" and j + 1 < len(raw) and raw[j + 1] in "sS" and (j + 2 == len(raw) or not _is_word_char(raw[j + 2])):
+            j += 2
+        elif raw[j] in _SUFFIX_CHARS:
+            j += 1
+        else:
+            return False
+    return True
+
+
+def _url_chunk_split(raw, pos, part_start, part_end):
+    """
+    Does the whitespace-delimited chunk around pos form a URL, e-mail address
+    or bare domain that the match only partly covers? The tokenizer keeps
+    those whole (e.g. "python.org", "pandas-node.js").
+    """
+    left = pos
+    while left > 0 and not raw[left - 1].isspace():
+        left -= 1
+    right = pos
+    while right < len(raw) and not raw[right].isspace():
+        right += 1
+    # Strip affix punctuation the way the tokenizer does before matching URLs
+    while left < right and raw[left] in _PREFIX_CHARS:
+        left += 1
+    while left < right:
+        if right - left >= 2 and raw[right - 2] in "'’" and raw[right - 1] in "sS":
+            right -= 2
+        elif raw[right - 1] in _SUFFIX_CHARS:
+            right -= 1
+        else:
+            break
+    return (left, right) != (part_start, part_end) and bool(_URL_RE.match(raw[left:right]))
+
+
+def _inside_url(raw, start, end):
+    # Multi-word matches touch two chunks: the one holding their first word and
+    # the one holding their last
+    first_end = start
+    while first_end < end and not raw[first_end].isspace():
+        first_end += 1
+    last_start = end
+    while last_start > start and not raw[last_start - 1].isspace():
+        last_start -= 1
+    return (_url_chunk_split(raw, start, start, first_end)
+            or _url_chunk_split(raw, end - 1, last_start, end))
+
+
+def _token_match(raw, start, end):
+    if not (_token_start(raw, start) and _token_end(raw, end)):
+        return False
+    # A lower.Upper period inside the match would be split ("Node.Js")
+    for k in range(start + 1, end - 1):
+        if raw[k] == "." and _is_infix(raw, k):
+            return False
+    return not _inside_url(raw, start, end)
+
+
+def _regex_match(raw, start, end):
+    """Regex \\b semantics on both sides"""
+    return ((start == 0 or not _is_word_char(raw[start - 1]))
+            and (end == len(raw) or not _is_word_char(raw[end])))
+
+
+class SkillAutomaton:
+    """
+    Aho-Corasick automaton over lowercased characters. Every skill phrase is
+    found in one pass, linear in text length, then filtered by boundary rules
+    that mirror the spaCy English tokenizer (prefixes, suffixes, infixes,
+    URLs), so results match the PhraseMatcher on 'c++', 'c#', 'node.js',
+    'ci/cd' and multi-word skills. benchmarks/run.py counts any mismatches
+    on its corpus. Known differences, all from unusual punctuation glued to
+    a skill, where spaCy applies affix and infix rules in an order this
+    does not replicate:
+    - '~' right after a skill and followed by more punctuation ('flutter~;'),
+      or '—' plus punctuation plus a letter ('jest—"x'): spaCy keeps them in
+      one token, this matches
+    - a possessive followed by more punctuation ("spring’s_"), or a period
+      plus punctuation plus a letter ('data science.,x'): spaCy matches,
+      this does not
+    """
+
+    def __init__(self, phrases, regex_phrases=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        # Each output is (phrase, accept): regex_phrases use \b, the rest token edges
+        for phrase in phrases:
+            self._add(phrase.lower(), _token_match)
+        for phrase in regex_phrases:
+            self._add(phrase.lower(), _regex_match)
+        self._build()
+
+    def _add(self, phrase, accept):
+        if not phrase:
+            return
+        state = 0
+        for c in phrase:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if (phrase, accept) not in self._out[state]:
+            self._out[state].append((phrase, accept))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(c, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Set of phrases occurring in text on valid boundaries"""
+        found = set()
+        if not text:
+            return found
+        lowered = text.lower()
+        # Boundary rules look at the original casing; a few characters change
+        # length when lowercased, in which case fall back to the lowered text
+        raw = text if len(lowered) == len(text) else lowered
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, c in enumerate(lowered, 1):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for phrase, accept in out[state]:
+                if phrase not in found and accept(raw, end - len(phrase), end):
+                    found.add(phrase)
+        return found
+
+
+if __name__ == "__main__":
+    automaton = SkillAutomaton(["python", "c++", "c#", "node.js", "ci/cd", "spring", "spring boot"], DB_VARIANTS)
+    print(sorted(automaton.find_all("Python, C++ and C# with Node.js; CI/CD on Spring Boot + PostgreSQL (python.org)")))